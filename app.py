@@ -57,6 +57,9 @@ def main():
         </style>
         """, unsafe_allow_html=True)
 
+    # 데이터 미리 불러오기 (프로세스당 한 번만 시작)
+    utils.start_cache_warmup()
+
     if 'logged_in' not in st.session_state:
         st.session_state['logged_in'] = False
         st.session_state['username'] = None
@@ -101,6 +104,16 @@ def main():
                                    styles=styles,
                                    )
 
+            with st.expander("데이터 준비 상태"):
+                st.dataframe(utils.get_cache_warmup_status(), hide_index=True)
+                st.dataframe(utils.get_cache_memory_report(), hide_index=True)
+                peak_memory_mb = utils.get_process_peak_memory_mb()
+                if peak_memory_mb is not None:
+                    st.caption(f"프로세스 최대 메모리: {peak_memory_mb:,.0f} MB")
+                pool_stats = utils.get_bigquery_pool_stats()
+                st.caption(f"빅쿼리 커넥션: {pool_stats['connections_opened']:,} 개 (대기 {pool_stats['connections_idle']:,} 개), "
+                           f"요청 {pool_stats['requests']:,} 회 중 재사용 {pool_stats['connections_reused']:,} 회")
+
         if selected == "납품 현황":
             utils.log_user_action(st.session_state['username'], "viewed HOME", "SERVICE_DATA", "logs")
             # home_app.home_app()
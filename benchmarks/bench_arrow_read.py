@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# 예전 조회 경로(전체 열을 Arrow로 받아 DataFrame으로 만든 뒤 열 선택)와 필요한 열만 읽는 경로의 시간/메모리 비교
+# 빅쿼리 대신 로컬 Arrow 파일을 읽고, 경로마다 별도 프로세스에서 최대 메모리를 잰다
+# utils를 불러오므로 앱과 같은 환경(.streamlit/secrets.toml)에서 실행
+#   python benchmarks/bench_arrow_read.py --rows 500000 --extra-columns 30
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+
+NUMERIC_COLUMNS = {'납품요구변경차수', '물품순번', '단가', '수량', '금액', '증감납품요구수량', '증감납품요구금액', '계약변경차수', '납품요구수량', '납품요구금액'}
+
+def make_g2b_table(num_rows, extra_columns):
+    rng = np.random.default_rng(0)
+
+    # 로더가 쓰는 열 + 화면에 쓰지 않는 열로 넓은 g2b_data를 흉내 낸다
+    arrays = {}
+    for column in utils.G2B_COLUMNS + [f'미사용열_{i:02d}' for i in range(extra_columns)]:
+        if column in NUMERIC_COLUMNS:
+            arrays[column] = pa.array(rng.integers(0, 10 ** 7, num_rows))
+        else:
+            vocabulary = np.array([f'{column}_{i}' for i in range(1000)])
+            arrays[column] = pa.array(vocabulary[rng.integers(0, len(vocabulary), num_rows)])
+
+    return pa.table(arrays)
+
+def read_current(path):
+    # 예전 list_rows().to_dataframe(): 모든 열을 Arrow로 받아 DataFrame으로 바꾼 뒤 필요한 열만 남긴다
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    df = table.to_pandas()
+
+    return df[utils.G2B_COLUMNS]
+
+def read_arrow(path):
+    # read_arrow_table_from_bigquery + read_data_cache: 필요한 열만 골라 Arrow 버퍼에서 바로 변환
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all().select(utils.G2B_COLUMNS)
+
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+READERS = {'current': read_current, 'arrow': read_arrow}
+
+def run_child(name, path):
+    memory_before = utils.get_process_peak_memory_mb()
+
+    start = time.perf_counter()
+    df = READERS[name](path)
+    elapsed = time.perf_counter() - start
+
+    memory_after = utils.get_process_peak_memory_mb()
+    peak_mb = None if memory_before is None else memory_after - memory_before
+
+    print(json.dumps({'seconds': elapsed, 'peak_mb': peak_mb, 'frame_mb': df.memory_usage(deep=True).sum() / 1024 ** 2}))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--extra-columns', type=int, default=30)
+    parser.add_argument('--run', choices=list(READERS))
+    parser.add_argument('--file')
+    args = parser.parse_args()
+
+    if args.run:
+        run_child(args.run, args.file)
+        return
+
+    table = make_g2b_table(args.rows, args.extra_columns)
+    print(f"g2b stand-in: {args.rows:,} rows x {table.num_columns} columns, "
+          f"{table.nbytes / 1024 ** 2:,.1f}MB (needed columns {table.select(utils.G2B_COLUMNS).nbytes / 1024 ** 2:,.1f}MB)")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'g2b_data.arrow')
+        with pa.OSFile(path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        del table
+
+        for name in READERS:
+            output = subprocess.run([sys.executable, __file__, '--run', name, '--file', path], check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            peak = 'n/a' if result['peak_mb'] is None else f"{result['peak_mb']:,.0f}MB"
+            print(f"{name:<8} {result['seconds']:7.2f}s  peak +{peak}  frame {result['frame_mb']:,.0f}MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# 호출마다 새 클라이언트를 만드는 방식과 커넥션 풀을 공유하는 방식의 지연 시간 비교
+# 로컬 가짜 빅쿼리 서버에 요청하므로 네트워크 없이 실행된다 (utils를 불러오므로 앱과 같은 환경(.streamlit/secrets.toml)에서 실행)
+#   python benchmarks/bench_bigquery_client.py --requests 200 --threads 8
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import bigquery
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+
+PROJECT = 'benchmark'
+TABLE = f'{PROJECT}.DATA_MARTS.bench_table'
+
+class FakeBigQueryHandler(BaseHTTPRequestHandler):
+    # keep-alive를 지원해야 커넥션 재사용 효과가 드러난다
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # 새 커넥션마다 TLS 핸드셰이크 비용을 흉내 낸다
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.handshake_seconds)
+
+    def do_GET(self):
+        time.sleep(self.server.request_seconds)
+
+        dataset_id, table_id = self.path.split('?')[0].rstrip('/').split('/')[-3::2]
+        body = json.dumps({
+            'kind': 'bigquery#table',
+            'id': f'{PROJECT}:{dataset_id}.{table_id}',
+            'tableReference': {'projectId': PROJECT, 'datasetId': dataset_id, 'tableId': table_id},
+            'type': 'TABLE',
+            'numRows': '0',
+            'lastModifiedTime': str(int(time.time() * 1000)),
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_server(handshake_seconds, request_seconds):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBigQueryHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.handshake_seconds = handshake_seconds
+    server.request_seconds = request_seconds
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+def new_client(endpoint):
+    # 예전 방식: 호출마다 클라이언트(HTTP 세션)를 새로 만든다
+    return bigquery.Client(project=PROJECT, credentials=AnonymousCredentials(), client_options={'api_endpoint': endpoint})
+
+def run(name, server, get_client, num_requests, num_threads):
+    endpoint = f'http://127.0.0.1:{server.server_port}'
+    connections_before = server.connections
+
+    def call(_):
+        start = time.perf_counter()
+        get_client(endpoint).get_table(TABLE)
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        latencies = sorted(executor.map(call, range(num_requests)))
+    elapsed = time.perf_counter() - started
+
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{name:<10} p50 {p50:7.1f}ms  p95 {p95:7.1f}ms  total {elapsed:6.2f}s  "
+          f"connections {server.connections - connections_before:4d} / {num_requests} requests")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--handshake-ms', type=float, default=40.0)
+    parser.add_argument('--request-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    server = start_fake_server(args.handshake_ms / 1000, args.request_ms / 1000)
+
+    # 앱과 같은 팩토리로 만든 공유 클라이언트 (인증만 익명으로 바꾼다)
+    endpoint = f'http://127.0.0.1:{server.server_port}'
+    shared_client, http_adapter = utils.create_bigquery_client(AnonymousCredentials(), PROJECT, endpoint)
+
+    run('per-call', server, new_client, args.requests, args.threads)
+    run('pooled', server, lambda _: shared_client, args.requests, args.threads)
+    print(f"pool stats: {utils.get_bigquery_pool_stats(http_adapter)}")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
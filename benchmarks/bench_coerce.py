@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# 테이블별로 예전 로더식 변환(열마다 문자열 치환 -> 숫자/날짜 문자열)과 coerce_dataframe의 시간/메모리 비교
+# utils를 불러오므로 앱과 같은 환경(.streamlit/secrets.toml)에서 실행
+#   python benchmarks/bench_coerce.py --rows 200000
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+
+def make_raw_frame(schema, num_rows, rng):
+
+    # 빅쿼리에서 문자열로 내려오던 형태 그대로 만든다 (일부 결측 포함)
+    columns = {}
+    for column, column_type in schema.items():
+        if column_type == 'money':
+            values = pd.Series(rng.integers(0, 10 ** 9, num_rows)).map(lambda value: f"{value:,}")
+        elif column_type in ('area', 'number'):
+            values = pd.Series(rng.random(num_rows) * 10 ** 4).map(lambda value: f"{value:,.2f}")
+        elif column_type in ('date', 'datetime'):
+            days = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1500, num_rows), unit='D')
+            values = pd.Series(days.strftime('%Y-%m-%d'))
+        elif column_type == 'category':
+            values = pd.Series(rng.integers(0, 20, num_rows)).map(lambda value: f"{column}_{value}")
+        else:
+            values = pd.Series(rng.integers(0, num_rows, num_rows)).map(lambda value: f"{column} {value}")
+
+        values = values.astype(object)
+        values[rng.random(num_rows) < 0.01] = None
+        columns[column] = values
+
+    return pd.DataFrame(columns)
+
+def coerce_legacy(df, schema):
+    # 예전 로더: 열마다 쉼표 제거 -> 숫자 변환, 날짜는 다시 문자열로
+    for column, column_type in schema.items():
+        if column_type in ('money', 'area', 'number'):
+            df[column] = df[column].str.replace(',', '')
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        elif column_type in ('date', 'datetime'):
+            df[column] = pd.to_datetime(df[column]).dt.strftime('%Y-%m-%d')
+
+    return df
+
+def coerce_schema(df, table_id):
+    return utils.compact_dataframe(utils.coerce_dataframe(df, table_id))
+
+def measure(convert, df):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = convert(df)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak / 1024 ** 2, result.memory_usage(deep=True).sum() / 1024 ** 2
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    print(f"{'table':<26}{'path':<8}{'seconds':>9}{'peak MB':>10}{'frame MB':>10}")
+    for table_id, schema in utils.TABLE_SCHEMAS.items():
+        raw_df = make_raw_frame(schema, args.rows, rng)
+
+        for name, convert in [('legacy', lambda df: coerce_legacy(df, schema)), ('schema', lambda df: coerce_schema(df, table_id))]:
+            elapsed, peak_mb, frame_mb = measure(convert, raw_df.copy())
+            print(f"{table_id:<26}{name:<8}{elapsed:9.2f}{peak_mb:10.1f}{frame_mb:10.1f}")
+
+if __name__ == '__main__':
+    main()
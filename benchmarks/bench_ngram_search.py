@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# 합성 100만 행 사업명 열에서 str.contains 전체 스캔과 bigram 색인 검색의 지연 시간 비교 (결과가 같은지도 확인)
+#   python benchmarks/bench_ngram_search.py --rows 1000000
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import search_utils
+
+WORDS = [
+    '인조잔디', '조성', '사업', '체육', '공원', '정비', '학교', '운동장', '개선', '설치',
+    '보수', '도로', '하천', '생활', '문화', '센터', '건립', '노후', '시설', '교체',
+]
+
+QUERIES = ['인조잔디', '운동장 개선', '학교 인조잔디 조성', '센터', 'Park', '12', '없는검색어']
+
+def make_names(num_rows, num_unique, rng):
+    # 사업명은 고유값이 행 수보다 훨씬 적으므로 고유 사업명을 먼저 만들고 행에 나눠 준다
+    word_ids = rng.integers(0, len(WORDS), (num_unique, 4))
+    names = np.array([' '.join(WORDS[i] for i in ids) + f' {n}차 park' for n, ids in enumerate(word_ids)], dtype=object)
+
+    return pd.Series(names[rng.integers(0, num_unique, num_rows)])
+
+def scan(series, terms):
+    # 예전 필터: 검색어마다 열 전체를 다시 훑는다
+    mask = np.ones(len(series), dtype=bool)
+    for term in terms:
+        mask &= series.str.contains(term, case=False, regex=False).to_numpy()
+
+    return np.flatnonzero(mask)
+
+def timed(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+
+    return result, statistics.median(durations) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--unique', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    series = make_names(args.rows, args.unique, np.random.default_rng(0))
+
+    start = time.perf_counter()
+    index = search_utils.NgramIndex.from_series(series)
+    print(f"built bigram index over {args.rows:,} rows ({len(index.values):,} unique) in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'query':<22}{'rows':>10}{'scan ms':>10}{'index ms':>10}  same")
+    for query in QUERIES:
+        terms = query.split()
+        expected, scan_ms = timed(lambda: scan(series, terms), args.repeat)
+        positions, index_ms = timed(lambda: index.search(terms), args.repeat)
+
+        print(f"{query:<22}{len(positions):>10,}{scan_ms:>10.1f}{index_ms:>10.1f}  {np.array_equal(expected, positions)}")
+
+if __name__ == '__main__':
+    main()
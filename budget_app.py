@@ -1,46 +1,25 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 
-import pandas as pd
 from datetime import datetime, timedelta
 
 import utils
+import filter_utils
+import grid_utils
+import rollup_utils
 
 def filter_data(df, key_prefix):
-    key_column_index = df.columns.get_loc('세부사업명')
-    key_column = st.selectbox(
-        '필터링할 열 선택',
-        df.columns,
-        index=key_column_index,
-        key=f'selectbox_{key_prefix}'
-    )
-
-    if pd.api.types.is_numeric_dtype(df[key_column]):
-        min_value = float(df[key_column].min()) if not df[key_column].isna().all() else 0.0
-        max_value = float(df[key_column].max()) if not df[key_column].isna().all() else 0.0
-        value_range = (min_value, max_value) if min_value < max_value else (0.0, max_value)
-
-        min_value, max_value = st.slider(f'{key_column}에서 검색할 범위 선택',
-                                min_value=min_value,
-                                max_value=max_value,
-                                value=value_range,
-                                key=f'slider_{key_prefix}')
-
-        filtered_df = df[(df[key_column] >= min_value) & (df[key_column] <= max_value)]
-
-    else:
-        search_term = st.text_input(f'{key_column}에서 검색할 내용 입력', key=f'text_input_{key_prefix}')
-        if search_term:
-            filtered_df = df[df[key_column].str.contains(search_term, case=False, na=False)]
-        else:
-            filtered_df = df
+    filtered_df = filter_utils.filter_data(df, key_prefix, '세부사업명', 'budget_data')
 
     st.write(f"{len(filtered_df)} 건")
-    st.dataframe(filtered_df, hide_index=True)
+    grid_utils.paged_dataframe(filtered_df, key_prefix)
 
 def budget_app():
-    budget_df = utils.load_budget_data()
-    new_budget_df, latest_budget_df = utils.load_latest_budget_data()
+    # 서로 독립적인 데이터는 동시에 불러오고, 실패한 것만 따로 알린다
+    loaded, errors = utils.load_concurrently({
+        '전체 지자체 예산서': utils.load_budget_data,
+        '최근 등록된 지자체 예산서': utils.load_latest_budget_data,
+    })
 
     today = datetime.now().date()
     date_range = today - timedelta(days=30)
@@ -48,22 +27,74 @@ def budget_app():
     st.header("지자체 예산서")
     st.markdown("---")
 
-    tab1, tab2 = st.tabs(["최근 등록된 지자체 예산서", "전체 지자체 예산서"])
+    for name in errors:
+        st.warning(f"{name} 데이터를 불러오지 못했습니다. 잠시 후 다시 시도해주세요.")
+
+    tab1, tab2, tab3, tab4 = st.tabs(["최근 등록된 지자체 예산서", "전체 지자체 예산서", "기간별 변경 내역", "지역별 요약"])
 
     with tab1:
-        st.markdown("---")
-        st.subheader(f"금일 지자체 예산서 ({today})")
-        st.markdown("---")
-        filter_data(new_budget_df, 'new_budget_df')
+        if '최근 등록된 지자체 예산서' in loaded:
+            new_budget_df, latest_budget_df = loaded['최근 등록된 지자체 예산서']
+
+            st.markdown("---")
+            st.subheader(f"금일 지자체 예산서 ({today})")
+            st.markdown("---")
+            filter_data(new_budget_df, 'new_budget_df')
+
+            st.markdown("---")
+            st.subheader(f"최근 등록된 지자체 예산서 ({date_range} ~ {today})")
+            st.markdown("---")
+            filter_data(latest_budget_df, 'latest_budget_df')
+
+
+    with tab2:
+        if '전체 지자체 예산서' in loaded:
+            budget_df = loaded['전체 지자체 예산서']
+
+            st.markdown("---")
+            st.subheader("전체 지자체 예산서")
+            st.markdown("---")
+            filter_data(budget_df, 'budget_df')
 
+    with tab3:
         st.markdown("---")
-        st.subheader(f"최근 등록된 지자체 예산서 ({date_range} ~ {today})")
+        st.subheader("기간별 지자체 예산서 변경 내역")
         st.markdown("---")
-        filter_data(latest_budget_df, 'latest_budget_df')
 
+        col1, col2 = st.columns(2)
+        with col1:
+            start_date = st.date_input('비교 시작일', value=date_range, max_value=today, key='diff_start_date')
+        with col2:
+            end_date = st.date_input('비교 종료일', value=today, max_value=today, key='diff_end_date')
 
-    with tab2:
+        budget_diff = utils.diff_budget_snapshots(start_date, end_date)
+
+        if budget_diff['start_date'] is None or budget_diff['end_date'] is None:
+            st.info('선택한 기간에 수집된 예산서가 없습니다.')
+        else:
+            st.write(f"비교 기준 수집일: {budget_diff['start_date']} → {budget_diff['end_date']}")
+
+            st.markdown("---")
+            st.subheader("신규 항목")
+            filter_data(budget_diff['added'], 'diff_added')
+
+            st.markdown("---")
+            st.subheader("금액 변경 항목")
+            filter_data(budget_diff['changed'], 'diff_changed')
+
+            st.markdown("---")
+            st.subheader("삭제된 항목")
+            filter_data(budget_diff['removed'], 'diff_removed')
+
+    with tab4:
         st.markdown("---")
-        st.subheader("전체 지자체 예산서")
+        st.subheader("지역별 예산 요약")
         st.markdown("---")
-        filter_data(budget_df, 'budget_df')
\ No newline at end of file
+
+        synced_dates = utils.get_synced_dates('DATA_WAREHOUSE', 'budget_data')
+        if not synced_dates:
+            st.info('수집된 예산서가 없습니다.')
+        else:
+            collection_date = st.selectbox('수집일', synced_dates[::-1], key='rollup_collection_date')
+            _, budget_rollup = rollup_utils.get_budget_rollup(collection_date)
+            rollup_utils.rollup_summary(budget_rollup, 'budget')
@@ -1,42 +1,23 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 
-import pandas as pd
-
 import utils
+import filter_utils
+import grid_utils
+import rollup_utils
 
 def edu_budget_app():
-    edu_budget_df = utils.load_edu_budget_data()
-
     st.header("교육청 예산서")
     st.markdown("---")
 
-    key_column_index = edu_budget_df.columns.get_loc('과업명')
-
-    key_column = st.selectbox(
-        '필터링할 열 선택',
-        edu_budget_df.columns,
-        index=key_column_index
-    )
-    if pd.api.types.is_numeric_dtype(edu_budget_df[key_column]):
-        min_value = float(edu_budget_df[key_column].min())
-        max_value = float(edu_budget_df[key_column].max())
-        value_range = st.slider(f'{key_column}에서 검색할 범위 선택',
-                                  min_value=min_value,
-                                  max_value=max_value,
-                                  value=(min_value, max_value),
-                                  key='value_range')
-        edu_budget_filtered_df = edu_budget_df[(edu_budget_df[key_column] >= value_range[0]) & (edu_budget_df[key_column] <= value_range[1])]
+    # 요약은 전체 데이터가 필요하므로 펼쳤을 때만 집계표를 만든다
+    if st.toggle('지역별 요약 보기', key='edu_budget_rollup_toggle'):
+        rollup_utils.rollup_summary(rollup_utils.get_edu_budget_rollup(), 'edu_budget')
+        st.markdown("---")
 
-    else:
-        search_term = st.text_input(f'{key_column}에서 검색할 내용 입력', key='search_term')
-        if search_term:
-            edu_budget_filtered_df = edu_budget_df[edu_budget_df[key_column].str.contains(search_term, case=False, na=False)]
-        else:
-            edu_budget_filtered_df = edu_budget_df
+    # 테이블이 크고 아직 캐시에 없으면 조건을 빅쿼리로 보내 필요한 행만 받는다
+    edu_budget_source = filter_utils.TableSource('DATA_WAREHOUSE', 'edu_budget_data', utils.load_edu_budget_data)
+    edu_budget_filtered_df = filter_utils.filter_data(edu_budget_source, 'edu_budget', '과업명')
 
     st.write(f"{len(edu_budget_filtered_df)} 건")
-    st.dataframe(
-        edu_budget_filtered_df,
-        hide_index=True
-    )
\ No newline at end of file
+    grid_utils.paged_dataframe(edu_budget_filtered_df, 'edu_budget')
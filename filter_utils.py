@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+
+import numpy as np
+import pandas as pd
+import os
+
+from google.cloud import bigquery
+
+import utils
+import search_utils
+
+# 이 크기보다 큰 테이블은 전체를 내려받지 않고 빅쿼리에서 걸러서 받는다
+LOCAL_FILTER_MAX_BYTES = int(os.environ.get('LOCAL_FILTER_MAX_BYTES', 512 * 1024 ** 2))
+# 빅쿼리에서 걸러 받을 때 한 번에 가져올 최대 행 수
+PUSHDOWN_ROW_LIMIT = 50000
+# 목록 선택 필터에 보여줄 최대 값 개수
+IN_SET_MAX_OPTIONS = 500
+
+# 필터 대상에서 뺄 내부 관리용 열
+HIDDEN_COLUMNS = {utils.ROW_ID_COLUMN, utils.ROW_VERSION_COLUMN}
+
+# 스키마에 선언된 열 타입별 필터 종류
+SCHEMA_FILTER_KINDS = {
+    'money': 'range',
+    'area': 'range',
+    'number': 'range',
+    'date': 'date_range',
+    'datetime': 'date_range',
+    'category': 'in',
+    'text': 'contains',
+}
+
+def _number_expression(column):
+    # 문자열로 저장된 금액('1,234')도 숫자로 비교
+    return f"SAFE_CAST(REPLACE(CAST(`{column}` AS STRING), ',', '') AS FLOAT64)"
+
+def _date_expression(column):
+    # DATE / DATETIME / TIMESTAMP / 'YYYY-MM-DD...' 문자열을 모두 날짜로 비교
+    return f"SAFE_CAST(SUBSTR(CAST(`{column}` AS STRING), 1, 10) AS DATE)"
+
+class Contains:
+
+    def __init__(self, column, search_term, mode='plain'):
+        self.column = column
+        self.search_term = search_term
+        self.mode = mode
+
+    def evaluate(self, df):
+        return search_utils.search_positions(df, self.column, self.search_term, self.mode)
+
+    def to_sql(self, name):
+        # 초성/자모 검색은 로컬 색인에서만 가능하므로 빅쿼리에서는 일반 포함 검색으로 처리
+        clauses, parameters = [], []
+        for term_index, term in enumerate(self.search_term.split()):
+            parameter = f"{name}_{term_index}"
+            clauses.append(f"STRPOS(LOWER(CAST(`{self.column}` AS STRING)), @{parameter}) > 0")
+            parameters.append((parameter, 'STRING', term.lower()))
+
+        return ' AND '.join(clauses) or 'TRUE', parameters
+
+class Range:
+
+    def __init__(self, column, low, high):
+        self.column = column
+        self.low = float(low)
+        self.high = float(high)
+
+    def evaluate(self, df):
+        return search_utils.get_range_index(df, self.column).search([(self.low, self.high)])
+
+    def to_sql(self, name):
+        clause = f"{_number_expression(self.column)} BETWEEN @{name}_low AND @{name}_high"
+        return clause, [(f"{name}_low", 'FLOAT64', self.low), (f"{name}_high", 'FLOAT64', self.high)]
+
+class InSet:
+
+    def __init__(self, column, values):
+        self.column = column
+        self.values = tuple(values)
+
+    def evaluate(self, df):
+        values = df[self.column].astype(str) if not pd.api.types.is_bool_dtype(df[self.column]) else df[self.column]
+        return np.flatnonzero(values.isin(self.values).to_numpy())
+
+    def to_sql(self, name):
+        clause = f"CAST(`{self.column}` AS STRING) IN UNNEST(@{name})"
+        return clause, [(name, 'ARRAY<STRING>', tuple(str(value) for value in self.values))]
+
+class DateRange:
+
+    def __init__(self, column, start_date, end_date):
+        self.column = column
+        self.start_date = pd.Timestamp(start_date).date()
+        self.end_date = pd.Timestamp(end_date).date()
+
+    def evaluate(self, df):
+        dates = pd.to_datetime(df[self.column], errors='coerce').dt.normalize()
+        mask = (dates >= pd.Timestamp(self.start_date)) & (dates <= pd.Timestamp(self.end_date))
+
+        return np.flatnonzero(mask.to_numpy(dtype=bool, na_value=False))
+
+    def to_sql(self, name):
+        clause = f"{_date_expression(self.column)} BETWEEN @{name}_start AND @{name}_end"
+        return clause, [(f"{name}_start", 'DATE', self.start_date), (f"{name}_end", 'DATE', self.end_date)]
+
+def evaluate_predicates(df, predicates):
+
+    # 조건마다 행 위치를 구해 교집합 (AND)
+    positions = None
+    for predicate in predicates:
+        predicate_positions = predicate.evaluate(df)
+        positions = predicate_positions if positions is None else np.intersect1d(positions, predicate_positions)
+
+    if positions is None:
+        return df
+
+    return df.iloc[positions]
+
+def compile_predicates(predicates):
+
+    # 값은 모두 쿼리 파라미터로 넘기고 WHERE 절에는 열 이름만 들어간다
+    clauses, parameters = [], []
+    for predicate_index, predicate in enumerate(predicates):
+        clause, predicate_parameters = predicate.to_sql(f"p{predicate_index}")
+        clauses.append(f"({clause})")
+        parameters.extend(predicate_parameters)
+
+    return ' AND '.join(clauses) or 'TRUE', tuple(parameters)
+
+def _query_parameter(name, parameter_type, value):
+    if parameter_type.startswith('ARRAY<'):
+        return bigquery.ArrayQueryParameter(name, parameter_type[6:-1], list(value))
+
+    return bigquery.ScalarQueryParameter(name, parameter_type, value)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _query_filtered_dataframe(dataset_id, table_id, columns, where_clause, parameters, limit, version):
+    client = utils.get_bigquery_client()
+
+    select_columns = ', '.join(f"`{column}`" for column in columns) if columns else '*'
+    query = f"SELECT {select_columns} FROM `{dataset_id}.{table_id}` WHERE {where_clause} LIMIT {limit}"
+    job_config = bigquery.QueryJobConfig(query_parameters=[_query_parameter(*parameter) for parameter in parameters])
+
+    df = client.query(query, job_config=job_config).to_arrow().to_pandas(split_blocks=True, self_destruct=True)
+    df = utils.coerce_dataframe(df, table_id)
+
+    # 같은 조회 결과는 검색 색인도 같이 재사용되도록 버전을 남긴다
+    df.attrs['dataset_version'] = repr((dataset_id, table_id, where_clause, parameters, version))
+
+    return df
+
+def query_filtered_dataframe(dataset_id, table_id, predicates, columns=None, limit=PUSHDOWN_ROW_LIMIT):
+    where_clause, parameters = compile_predicates(predicates)
+    version = utils.get_table_version(dataset_id, table_id)
+
+    return _query_filtered_dataframe(dataset_id, table_id, tuple(columns or ()), where_clause, parameters, limit, version)
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _get_column_profile(dataset_id, table_id, column, kind, where_clause, parameters, version):
+    client = utils.get_bigquery_client()
+    job_config = bigquery.QueryJobConfig(query_parameters=[_query_parameter(*parameter) for parameter in parameters])
+
+    if kind == 'in':
+        query = f"""
+        SELECT DISTINCT CAST(`{column}` AS STRING) AS value
+        FROM `{dataset_id}.{table_id}`
+        WHERE {where_clause} AND `{column}` IS NOT NULL
+        ORDER BY value
+        LIMIT {IN_SET_MAX_OPTIONS}
+        """
+        return [row['value'] for row in client.query(query, job_config=job_config).result()]
+
+    expression = _number_expression(column) if kind == 'range' else _date_expression(column)
+    query = f"SELECT MIN({expression}) AS min_value, MAX({expression}) AS max_value FROM `{dataset_id}.{table_id}` WHERE {where_clause}"
+    row = list(client.query(query, job_config=job_config).result())[0]
+
+    return row['min_value'], row['max_value']
+
+class TableSource:
+
+    def __init__(self, dataset_id, table_id, loader, columns=None, base_predicates=()):
+        # loader: 전체를 불러오는 캐시된 로더, base_predicates: 로더가 이미 거는 조건 (빅쿼리 조회에도 붙인다)
+        self.dataset_id = dataset_id
+        self.table_id = table_id
+        self.loader = loader
+        self.columns = list(columns or utils.TABLE_SCHEMAS.get(table_id, {}))
+        self.base_predicates = list(base_predicates)
+
+    def column_profile(self, column, kind):
+        where_clause, parameters = compile_predicates(self.base_predicates)
+        version = utils.get_table_version(self.dataset_id, self.table_id)
+
+        return _get_column_profile(self.dataset_id, self.table_id, column, kind, where_clause, parameters, version)
+
+def choose_strategy(source):
+
+    if isinstance(source, pd.DataFrame):
+        return 'local'
+
+    # 이미 캐시에 올라와 있거나 충분히 작은 테이블은 내려받아 로컬 색인으로 거른다
+    if utils.is_loader_warm(source.loader):
+        return 'local'
+    if utils.get_table_num_bytes(source.dataset_id, source.table_id) <= LOCAL_FILTER_MAX_BYTES:
+        return 'local'
+
+    return 'bigquery'
+
+def _filter_kind(df, column, table_id=None):
+    declared = utils.TABLE_SCHEMAS.get(table_id, {}).get(column)
+    if declared is not None:
+        return SCHEMA_FILTER_KINDS[declared]
+
+    series = df[column]
+    if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+        return 'in'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'range'
+    if pd.api.types.is_datetime64_any_dtype(series) or str(series.dtype).startswith('date32'):
+        return 'date_range'
+
+    return 'contains'
+
+def _local_options(df, column, kind):
+    if kind == 'in':
+        values = df[column].dropna()
+        if not pd.api.types.is_bool_dtype(values):
+            values = values.astype(str)
+        return sorted(values.unique().tolist())[:IN_SET_MAX_OPTIONS]
+
+    if kind == 'range':
+        range_index = search_utils.get_range_index(df, column)
+        return range_index.min, range_index.max
+
+    dates = pd.to_datetime(df[column], errors='coerce').dropna()
+    if dates.empty:
+        return None, None
+
+    return dates.min().date(), dates.max().date()
+
+def _column_predicate(column, kind, options, key_prefix, allow_jamo):
+
+    if kind == 'range':
+        min_value, max_value = (float(value) if value is not None else 0.0 for value in options)
+        value_range = (min_value, max_value) if min_value < max_value else (0.0, max_value)
+        low, high = st.slider(f'{column}에서 검색할 범위 선택',
+                              min_value=min(value_range[0], min_value),
+                              max_value=max_value,
+                              value=value_range,
+                              key=f'{key_prefix}_{column}_range')
+        return Range(column, low, high)
+
+    if kind == 'in':
+        values = st.multiselect(f'{column}에서 선택', options, key=f'{key_prefix}_{column}_in')
+        return InSet(column, values) if values else None
+
+    if kind == 'date_range':
+        start_date, end_date = options
+        if start_date is None:
+            return None
+        selected = st.date_input(f'{column} 기간 선택', value=(start_date, end_date), key=f'{key_prefix}_{column}_dates')
+        # 시작일만 고른 상태에서는 조건을 걸지 않는다
+        if not isinstance(selected, (list, tuple)) or len(selected) != 2:
+            return None
+        return DateRange(column, *selected)
+
+    search_term = st.text_input(f'{column}에서 검색할 내용 입력', key=f'{key_prefix}_{column}_text')
+    jamo_search = allow_jamo and st.checkbox('초성·자모 검색 (예: ㅇㅈㅈㄷ)', key=f'{key_prefix}_{column}_jamo')
+    if not search_term.split():
+        return None
+
+    return Contains(column, search_term, 'jamo' if jamo_search else 'plain')
+
+def filter_data(source, key_prefix, default_column, table_id=None):
+
+    # source: 메모리에 있는 DataFrame 또는 TableSource (크기/캐시 상태에 따라 빅쿼리에서 거른다)
+    strategy = choose_strategy(source)
+
+    if strategy == 'local':
+        df = source if isinstance(source, pd.DataFrame) else source.loader()
+        table_id = table_id if isinstance(source, pd.DataFrame) else source.table_id
+        columns = [column for column in df.columns if column not in HIDDEN_COLUMNS]
+    else:
+        df = None
+        table_id = source.table_id
+        columns = source.columns
+
+    selected_columns = st.multiselect(
+        '필터링할 열 선택',
+        columns,
+        default=[default_column] if default_column in columns else [],
+        key=f'{key_prefix}_filter_columns'
+    )
+
+    predicates = []
+    for column in selected_columns:
+        if strategy == 'local':
+            kind = _filter_kind(df, column, table_id)
+            options = _local_options(df, column, kind)
+        else:
+            kind = SCHEMA_FILTER_KINDS[utils.TABLE_SCHEMAS.get(table_id, {}).get(column, 'text')]
+            options = source.column_profile(column, kind) if kind != 'contains' else None
+
+        predicate = _column_predicate(column, kind, options, key_prefix, allow_jamo=strategy == 'local')
+        if predicate is not None:
+            predicates.append(predicate)
+
+    if strategy == 'local':
+        return evaluate_predicates(df, predicates)
+
+    filtered_df = query_filtered_dataframe(source.dataset_id, source.table_id, source.base_predicates + predicates, source.columns)
+    if len(filtered_df) >= PUSHDOWN_ROW_LIMIT:
+        st.info(f"조건에 맞는 행이 많아 처음 {PUSHDOWN_ROW_LIMIT}건만 표시합니다. 조건을 더 좁혀주세요.")
+
+    return filtered_df
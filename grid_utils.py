@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+
+import numpy as np
+import pandas as pd
+
+import utils
+import search_utils
+
+PAGE_SIZE_OPTIONS = [50, 100, 200, 500]
+DEFAULT_PAGE_SIZE = 100
+
+NO_SORT = '(기본 순서)'
+
+# 화면에 보이지 않는 내부 관리용 열은 정렬 기준에서도 뺀다
+HIDDEN_COLUMNS = {utils.ROW_ID_COLUMN, utils.ROW_VERSION_COLUMN}
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _get_sort_order(_series, token, ascending):
+    # 정렬 결과는 행 위치 순열로만 보관 (데이터 버전/필터가 같으면 재사용)
+    order = _series.reset_index(drop=True).sort_values(ascending=ascending, kind='stable', na_position='last').index
+
+    return order.to_numpy()
+
+def get_sort_order(df, column, ascending=True):
+    return _get_sort_order(df[column], search_utils.frame_token(df, column) + (column,), ascending)
+
+def _page_controls(df, key_prefix):
+    columns = [column for column in df.columns if column not in HIDDEN_COLUMNS]
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        sort_column = st.selectbox('정렬 기준', [NO_SORT] + columns, key=f'{key_prefix}_sort_column')
+    with col2:
+        sort_direction = st.radio('정렬 방향', ['오름차순', '내림차순'], horizontal=True, key=f'{key_prefix}_sort_direction')
+    with col3:
+        page_size = st.selectbox('페이지당 행 수', PAGE_SIZE_OPTIONS, index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE), key=f'{key_prefix}_page_size')
+
+    page_count = max(1, -(-len(df) // page_size))
+
+    # 필터가 바뀌어 페이지 수가 줄면 마지막 페이지로 맞춘다
+    page_key = f'{key_prefix}_page'
+    if page_key not in st.session_state:
+        st.session_state[page_key] = 1
+    elif st.session_state[page_key] > page_count:
+        st.session_state[page_key] = page_count
+
+    # 값은 세션 상태로만 정한다 (기본값을 같이 주면 스트림릿이 경고)
+    with col4:
+        page = st.number_input('페이지', min_value=1, max_value=page_count, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    stop = min(start + page_size, len(df))
+
+    if sort_column == NO_SORT:
+        positions = np.arange(start, stop)
+    else:
+        positions = get_sort_order(df, sort_column, sort_direction == '오름차순')[start:stop]
+
+    st.caption(f"{start + 1 if stop else 0:,}–{stop:,} / {len(df):,} 건 ({page}/{page_count} 페이지)")
+
+    return df.iloc[positions], (sort_column, sort_direction, page_size, page)
+
+def paged_dataframe(df, key_prefix):
+
+    # 보이는 페이지만 브라우저로 보낸다
+    page_df, _ = _page_controls(df, key_prefix)
+    st.dataframe(page_df, hide_index=True)
+
+    return page_df
+
+def _apply_edits(df, edits):
+    mask = df[utils.ROW_ID_COLUMN].isin(list(edits)).to_numpy()
+    if not mask.any():
+        return df
+
+    df = df.copy()
+    edited = pd.DataFrame.from_dict(edits, orient='index')
+    edited_row_ids = df.loc[mask, utils.ROW_ID_COLUMN]
+    for column in edited.columns:
+        df.loc[mask, column] = edited.loc[edited_row_ids, column].to_numpy()
+
+    return df
+
+def get_pending_edits(key_prefix):
+    return st.session_state.setdefault(f'{key_prefix}_edits', {})
+
+def clear_pending_edits(key_prefix, row_ids=None):
+    # row_ids를 주면 그 행(저장이 끝난 행)의 편집만 지운다
+    if row_ids is None:
+        st.session_state.pop(f'{key_prefix}_edits', None)
+        return
+
+    edits = get_pending_edits(key_prefix)
+    for row_id in row_ids:
+        edits.pop(row_id, None)
+
+def paged_editor(df, key_prefix, source_df=None, **editor_kwargs):
+
+    # 페이지를 넘겨도 고친 값이 남도록 행 ID별로 세션에 모아 둔다
+    # source_df: 필터 전 전체 프레임 (검색/필터로 가려진 행의 편집도 돌려준다)
+    edits = get_pending_edits(key_prefix)
+    source_df = df if source_df is None else source_df
+
+    page_df, page_state = _page_controls(df, key_prefix)
+    page_view = _apply_edits(page_df, edits)
+
+    # 편집기 상태는 행 순서 기준이므로 데이터/필터/정렬/페이지마다 따로 둔다
+    editor_token = hash((search_utils.frame_token(df),) + page_state)
+    edited_page = st.data_editor(page_view, hide_index=True, key=f'{key_prefix}_editor_{editor_token}', **editor_kwargs)
+
+    # 이 페이지의 행은 원본과 다시 비교해 되돌린 값은 편집 목록에서 뺀다
+    for row_id in page_df[utils.ROW_ID_COLUMN]:
+        edits.pop(row_id, None)
+    for row in utils.diff_edited_rows(page_df, edited_page).to_dict('records'):
+        edits[row[utils.ROW_ID_COLUMN]] = row
+
+    # 필터와 관계없이 모든 페이지에서 고친 행 (원래 인덱스 유지)
+    return _apply_edits(source_df[source_df[utils.ROW_ID_COLUMN].isin(list(edits)).to_numpy()], edits)
@@ -1,14 +1,16 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 
-import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
 
 import utils
+import filter_utils
+import grid_utils
 
 def list_up_app():
-    today = datetime.now().strftime('%Y%m%d_%H%M%S')
+    # 행 ID/버전 열이 없는 예전 테이블은 편집 화면을 열 때 한 번만 채운다 (조회/예열 경로에서는 테이블을 바꾸지 않음)
+    for table_id in ['list_up_budget_data', 'list_up_edu_budget_data']:
+        utils.ensure_row_ids('DATA_MARTS', table_id)
 
     list_up_budget_data, list_up_edu_budget_data = utils.load_list_up_data()
 
@@ -25,63 +27,63 @@ def list_up_app():
         # CSV 업로드
         uploaded_file = st.file_uploader("지자체 예산 CSV 파일 업로드", type="csv", key='list_up_budget_file_uploader')
 
-        utils.save_dataframe_to_bigquery(list_up_budget_data, 'list_up_data_backup', f'list_up_budget_data_{today}')
+        # 같은 파일은 한 번만 반영 (재실행마다 다시 저장하지 않음)
+        if uploaded_file is not None and st.session_state.get('list_up_budget_uploaded_file_id') != uploaded_file.file_id:
+            st.session_state['list_up_budget_uploaded_file_id'] = uploaded_file.file_id
 
-        if uploaded_file is not None:
             # 업로드된 CSV 파일 읽기
             uploaded_df = pd.read_csv(uploaded_file)
 
             # 업로드된 데이터로 기존 데이터프레임 완전히 대체
             list_up_budget_data = uploaded_df
+            list_up_budget_data = utils.assign_row_ids(list_up_budget_data)
             list_up_budget_data = list_up_budget_data.sort_values(by=['지역명', '자치단체명'])
 
+            utils.backup_table_snapshot('DATA_MARTS', 'list_up_budget_data', 'list_up_data_backup')
             utils.save_dataframe_to_bigquery(list_up_budget_data, 'DATA_MARTS', 'list_up_budget_data')
             utils.log_user_action(st.session_state['username'], "save list 지자체 현황 csv uploaded", "SERVICE_DATA", "logs")
 
-        st.markdown("---")
-
-        numeric_columns = ['예산현액', '국비', '시도비', '시군구비', '기타', '지출액', '편성액']
-
-        for column in numeric_columns:
-            list_up_budget_data[column] = list_up_budget_data[column].replace('None', np.nan)
-            list_up_budget_data[column] = pd.to_numeric(list_up_budget_data[column].astype(str).str.replace(',', ''), errors='coerce')
+            # 캐시된 프레임은 로더에서 이미 변환되어 있으므로 업로드한 프레임만 변환
+            list_up_budget_data = utils.coerce_dataframe(list_up_budget_data, 'list_up_budget_data')
 
-        key_column = st.selectbox('필터링할 열 선택', list_up_budget_data.columns, index=list_up_budget_data.columns.get_loc('세부사업명'), key='list_up_budget_data_key_column')
-
-        if key_column in numeric_columns:
-            min_value = float(list_up_budget_data[key_column].min())
-            max_value = float(list_up_budget_data[key_column].max())
-            value_range = st.slider(f'{key_column}에서 검색할 범위 선택',
-                                    min_value=min_value,
-                                    max_value=max_value,
-                                    value=(min_value, max_value),
-                                    key='list_up_budget_data_value_range')
+        st.markdown("---")
 
-            list_up_budget_data_filtered = list_up_budget_data[(list_up_budget_data[key_column] >= value_range[0]) & (list_up_budget_data[key_column] <= value_range[1])]
-        else:
-            search_term = st.text_input(f'{key_column}에서 검색할 내용 입력', key='list_up_budget_data_search_term')
-            if search_term:
-                list_up_budget_data_filtered = list_up_budget_data[list_up_budget_data[key_column].str.contains(search_term, case=False, na=False)]
-            else:
-                list_up_budget_data_filtered = list_up_budget_data
+        list_up_budget_data_filtered = filter_utils.filter_data(list_up_budget_data, 'list_up_budget_data', '세부사업명', 'list_up_budget_data')
 
         st.markdown("---")
         list_up_budget_data_display = list_up_budget_data_filtered[list_up_budget_data_filtered['삭제'] == False]
         st.write(f"{len(list_up_budget_data_display)} 건")
 
-        list_up_budget_edited_data = st.data_editor(
+        list_up_budget_edited_data = grid_utils.paged_editor(
             list_up_budget_data_display,
-            hide_index=True,
+            'list_up_budget_data',
+            source_df=list_up_budget_data,
+            column_config={utils.ROW_ID_COLUMN: None, utils.ROW_VERSION_COLUMN: None},
+            disabled=[utils.ROW_ID_COLUMN, utils.ROW_VERSION_COLUMN],
         )
 
-        # 원본 데이터 프레임 업데이트: 인덱스를 기준으로 편집된 데이터 반영
-        list_up_budget_data.loc[list_up_budget_edited_data.index, :] = list_up_budget_edited_data
+        # 편집 전 데이터와 비교해 변경된 행만 추림 (저장 시 이 행들만 MERGE)
+        list_up_budget_changed_rows = utils.diff_edited_rows(list_up_budget_data, list_up_budget_edited_data)
+
+        if st.button('지자체 편집 취소'):
+            grid_utils.clear_pending_edits('list_up_budget_data')
+            st.rerun()
 
         if st.button('지자체 저장'):
-            utils.save_dataframe_to_bigquery(list_up_budget_data, 'DATA_MARTS', 'list_up_budget_data')
-            utils.log_user_action(st.session_state['username'], "save list 지자체 현황", "SERVICE_DATA", "logs")
+            if list_up_budget_changed_rows.empty:
+                st.info('변경된 내용이 없습니다.')
+            else:
+                utils.backup_table_snapshot('DATA_MARTS', 'list_up_budget_data', 'list_up_data_backup')
+                conflicts = utils.upsert_dataframe_to_bigquery(list_up_budget_changed_rows, 'DATA_MARTS', 'list_up_budget_data')
+                utils.log_user_action(st.session_state['username'], "save list 지자체 현황", "SERVICE_DATA", "logs")
+                # 저장된 행의 편집만 지우고, 충돌한 행은 사용자가 확인할 때까지 남겨 둔다
+                saved_row_ids = set(list_up_budget_changed_rows[utils.ROW_ID_COLUMN]) - set(conflicts)
+                grid_utils.clear_pending_edits('list_up_budget_data', saved_row_ids)
 
-            st.success('지자체 예산 현황이 성공적으로 저장되었습니다.')
+                if conflicts:
+                    st.warning(f'다른 사용자가 먼저 수정한 {len(conflicts)} 건은 저장되지 않았습니다. 고친 내용을 확인한 뒤 \'지자체 편집 취소\'로 지우고 다시 편집해주세요.')
+                else:
+                    st.success('지자체 예산 현황이 성공적으로 저장되었습니다.')
 
 
     with tab2:
@@ -92,59 +94,58 @@ def list_up_app():
         # CSV 업로드
         uploaded_file = st.file_uploader("교육청 예산 CSV 파일 업로드", type="csv", key='list_up_edu_budget_file_uploader')
 
-        utils.save_dataframe_to_bigquery(list_up_edu_budget_data, 'list_up_data_backup', f'list_up_edu_budget_data_{today}')
+        # 같은 파일은 한 번만 반영 (재실행마다 다시 저장하지 않음)
+        if uploaded_file is not None and st.session_state.get('list_up_edu_budget_uploaded_file_id') != uploaded_file.file_id:
+            st.session_state['list_up_edu_budget_uploaded_file_id'] = uploaded_file.file_id
 
-        if uploaded_file is not None:
             # 업로드된 CSV 파일 읽기
             uploaded_df = pd.read_csv(uploaded_file)
 
             # 업로드된 데이터로 기존 데이터프레임 완전히 대체
             list_up_edu_budget_data = uploaded_df
+            list_up_edu_budget_data = utils.assign_row_ids(list_up_edu_budget_data)
             list_up_edu_budget_data = list_up_edu_budget_data.sort_values(by=['도광역시', '시군구'])
 
+            utils.backup_table_snapshot('DATA_MARTS', 'list_up_edu_budget_data', 'list_up_data_backup')
             utils.save_dataframe_to_bigquery(list_up_edu_budget_data, 'DATA_MARTS', 'list_up_edu_budget_data')
             utils.log_user_action(st.session_state['username'], "save list 교육청 현황 csv uploaded", "SERVICE_DATA", "logs")
 
-        st.markdown("---")
+            list_up_edu_budget_data = utils.coerce_dataframe(list_up_edu_budget_data, 'list_up_edu_budget_data')
 
-        numeric_columns = ['금액', '면적']
-
-        for column in numeric_columns:
-            list_up_edu_budget_data[column] = list_up_edu_budget_data[column].replace('None', np.nan)
-            list_up_edu_budget_data[column] = pd.to_numeric(list_up_edu_budget_data[column].astype(str).str.replace(',', ''), errors='coerce')
-
-        key_column = st.selectbox('필터링할 열 선택', list_up_edu_budget_data.columns, index=list_up_edu_budget_data.columns.get_loc('과업명'), key='list_up_edu_budget_data_key_column')
-
-        if key_column in numeric_columns:
-            min_value = float(list_up_edu_budget_data[key_column].min())
-            max_value = float(list_up_edu_budget_data[key_column].max())
-            value_range = st.slider(f'{key_column}에서 검색할 범위 선택',
-                                    min_value=min_value,
-                                    max_value=max_value,
-                                    value=(min_value, max_value),
-                                    key='list_up_edu_budget_data_value_range')
+        st.markdown("---")
 
-            list_up_edu_budget_data_filtered = list_up_edu_budget_data[(list_up_edu_budget_data[key_column] >= value_range[0]) & (list_up_edu_budget_data[key_column] <= value_range[1])]
-        else:
-            search_term = st.text_input(f'{key_column}에서 검색할 내용 입력', key='list_up_edu_budget_data_search_term')
-            if search_term:
-                list_up_edu_budget_data_filtered = list_up_edu_budget_data[list_up_edu_budget_data[key_column].str.contains(search_term, case=False, na=False)]
-            else:
-                list_up_edu_budget_data_filtered = list_up_edu_budget_data
+        list_up_edu_budget_data_filtered = filter_utils.filter_data(list_up_edu_budget_data, 'list_up_edu_budget_data', '과업명', 'list_up_edu_budget_data')
 
         st.markdown("---")
         list_up_edu_budget_data_display = list_up_edu_budget_data_filtered[list_up_edu_budget_data_filtered['삭제'] == False]
         st.write(f"{len(list_up_edu_budget_data_display)} 건")
 
-        list_up_edu_budget_edited_data = st.data_editor(
+        list_up_edu_budget_edited_data = grid_utils.paged_editor(
             list_up_edu_budget_data_display,
-            hide_index=True,
+            'list_up_edu_budget_data',
+            source_df=list_up_edu_budget_data,
+            column_config={utils.ROW_ID_COLUMN: None, utils.ROW_VERSION_COLUMN: None},
+            disabled=[utils.ROW_ID_COLUMN, utils.ROW_VERSION_COLUMN],
         )
 
-        list_up_edu_budget_data.loc[list_up_edu_budget_edited_data.index, :] = list_up_edu_budget_edited_data
+        list_up_edu_budget_changed_rows = utils.diff_edited_rows(list_up_edu_budget_data, list_up_edu_budget_edited_data)
 
-        if st.button('교육청 저장'):
-            utils.save_dataframe_to_bigquery(list_up_edu_budget_data, 'DATA_MARTS', 'list_up_edu_budget_data')
-            utils.log_user_action(st.session_state['username'], "save list 교육청 현황", "SERVICE_DATA", "logs")
+        if st.button('교육청 편집 취소'):
+            grid_utils.clear_pending_edits('list_up_edu_budget_data')
+            st.rerun()
 
-            st.success('교육청 예산 현황이 성공적으로 저장되었습니다.')
\ No newline at end of file
+        if st.button('교육청 저장'):
+            if list_up_edu_budget_changed_rows.empty:
+                st.info('변경된 내용이 없습니다.')
+            else:
+                utils.backup_table_snapshot('DATA_MARTS', 'list_up_edu_budget_data', 'list_up_data_backup')
+                conflicts = utils.upsert_dataframe_to_bigquery(list_up_edu_budget_changed_rows, 'DATA_MARTS', 'list_up_edu_budget_data')
+                utils.log_user_action(st.session_state['username'], "save list 교육청 현황", "SERVICE_DATA", "logs")
+                # 저장된 행의 편집만 지우고, 충돌한 행은 사용자가 확인할 때까지 남겨 둔다
+                saved_row_ids = set(list_up_edu_budget_changed_rows[utils.ROW_ID_COLUMN]) - set(conflicts)
+                grid_utils.clear_pending_edits('list_up_edu_budget_data', saved_row_ids)
+
+                if conflicts:
+                    st.warning(f'다른 사용자가 먼저 수정한 {len(conflicts)} 건은 저장되지 않았습니다. 고친 내용을 확인한 뒤 \'교육청 편집 취소\'로 지우고 다시 편집해주세요.')
+                else:
+                    st.success('교육청 예산 현황이 성공적으로 저장되었습니다.')
\ No newline at end of file
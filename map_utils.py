@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+
+import numpy as np
+import pandas as pd
+
+import search_utils
+
+# 격자는 가장 세밀한 확대 단계에서 한 번만 나누고, 덜 확대된 단계는 격자 번호를 합쳐 만든다
+MAP_MAX_ZOOM = 14
+MAP_BASE_CELL_DEGREES = 180 / 2 ** (MAP_MAX_ZOOM + 2)
+# 지도에 보낼 최대 지점 수 (금액이 큰 순서)
+MAP_MAX_FEATURES = 2000
+
+# 확대 단계별 묶음 단위
+SIDO_MAX_ZOOM = 7
+SIGUNGU_MAX_ZOOM = 9
+
+# 지도에서 고를 수 있는 필터 열 (집계표에 차원으로 남긴다)
+MAP_FILTER_COLUMNS = ['계약구분', '수요기관구분']
+MAP_VALUE_COLUMNS = ['금액', '수량']
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _get_g2b_cube(_g2b_df, token):
+    g2b_df = _g2b_df[['도광역시', '시군구', '위도', '경도', '납품요구접수일자'] + MAP_FILTER_COLUMNS + MAP_VALUE_COLUMNS]
+
+    # 좌표가 없는 행(지역명 매칭 실패)은 지도에 올릴 수 없다
+    g2b_df = g2b_df[g2b_df['위도'].notna() & g2b_df['경도'].notna()]
+
+    received = pd.to_datetime(g2b_df['납품요구접수일자'], errors='coerce')
+    cube_keys = {
+        '도광역시': g2b_df['도광역시'],
+        '시군구': g2b_df['시군구'],
+        'cell_x': np.floor(g2b_df['경도'].to_numpy() / MAP_BASE_CELL_DEGREES).astype(np.int64),
+        'cell_y': np.floor(g2b_df['위도'].to_numpy() / MAP_BASE_CELL_DEGREES).astype(np.int64),
+        '월': (received.dt.year * 100 + received.dt.month).fillna(0).astype(np.int32),
+    }
+    cube_keys.update({column: g2b_df[column] for column in MAP_FILTER_COLUMNS})
+
+    # 가장 세밀한 격자 x 월 x 필터 조합별 합계 (중심 좌표는 합계로 두었다가 나중에 나눈다)
+    values = pd.DataFrame({
+        '금액': g2b_df['금액'].to_numpy(dtype='float64', na_value=0.0),
+        '수량': g2b_df['수량'].to_numpy(dtype='float64', na_value=0.0),
+        '건수': 1,
+        '위도합': g2b_df['위도'].to_numpy(dtype='float64'),
+        '경도합': g2b_df['경도'].to_numpy(dtype='float64'),
+    }, index=g2b_df.index)
+
+    cube = values.groupby([pd.Series(key, index=g2b_df.index, name=name) for name, key in cube_keys.items()],
+                          observed=True, dropna=False, sort=False).sum().reset_index()
+
+    print(f"Built g2b map cube: {len(_g2b_df)} rows -> {len(cube)} buckets.")
+
+    return cube
+
+def get_g2b_cube(g2b_df):
+    return _get_g2b_cube(g2b_df, search_utils.frame_token(g2b_df))
+
+def level_for_zoom(zoom):
+    if zoom <= SIDO_MAX_ZOOM:
+        return 'sido'
+    if zoom <= SIGUNGU_MAX_ZOOM:
+        return 'sigungu'
+
+    return 'grid'
+
+def aggregate_g2b_for_map(g2b_df, zoom, months=None, filters=None, bounds=None, level=None):
+
+    # months: (시작 YYYYMM, 끝 YYYYMM), filters: {열: [값, ...]}, bounds: (남, 서, 북, 동)
+    cube = get_g2b_cube(g2b_df)
+    level = level or level_for_zoom(zoom)
+
+    mask = np.ones(len(cube), dtype=bool)
+    if months is not None:
+        mask &= cube['월'].between(*months).to_numpy()
+    for column, values in (filters or {}).items():
+        if values:
+            mask &= cube[column].astype(str).isin([str(value) for value in values]).to_numpy()
+    if bounds is not None:
+        south, west, north, east = bounds
+        cell_lat = (cube['cell_y'].to_numpy() + 0.5) * MAP_BASE_CELL_DEGREES
+        cell_lon = (cube['cell_x'].to_numpy() + 0.5) * MAP_BASE_CELL_DEGREES
+        mask &= (cell_lat >= south) & (cell_lat <= north) & (cell_lon >= west) & (cell_lon <= east)
+    cube = cube[mask]
+
+    if level == 'sido':
+        keys = [cube['도광역시']]
+    elif level == 'sigungu':
+        keys = [cube['도광역시'], cube['시군구']]
+    else:
+        # 확대 단계가 한 단계 낮아질 때마다 격자 한 변이 두 배
+        cell_span = 2 ** (MAP_MAX_ZOOM - min(max(int(zoom), 0), MAP_MAX_ZOOM))
+        keys = [(cube['cell_x'] // cell_span).rename('cell_x'), (cube['cell_y'] // cell_span).rename('cell_y')]
+
+    features = cube.groupby(keys, observed=True, dropna=False)[['금액', '수량', '건수', '위도합', '경도합']].sum()
+
+    features['위도'] = features['위도합'] / features['건수']
+    features['경도'] = features['경도합'] / features['건수']
+    features['버킷'] = [' '.join(str(part) for part in (key if isinstance(key, tuple) else (key,)) if pd.notna(part)) for key in features.index]
+
+    features = features.reset_index(drop=True)[['버킷', '위도', '경도', '금액', '수량', '건수']]
+    features = features.sort_values(by='금액', ascending=False).head(MAP_MAX_FEATURES)
+
+    return features
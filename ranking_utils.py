@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import functools
+import re
+import threading
+
+# 제목에 나온 키워드는 본문보다 무겁게 본다
+TITLE_WEIGHT = 2.0
+CONTENT_WEIGHT = 1.0
+
+def parse_keyword_weights(text):
+    # '인조잔디:3,예산:2,추경:1' 형식 (가중치를 생략하면 1)
+    weights = {}
+    for item in text.split(','):
+        keyword, _, weight = item.strip().partition(':')
+        if keyword:
+            weights[keyword] = float(weight) if weight else 1.0
+
+    return weights
+
+class KeywordRanker:
+
+    def __init__(self, weights, title_weight=TITLE_WEIGHT, content_weight=CONTENT_WEIGHT):
+        self.weights = dict(weights)
+        self.title_weight = title_weight
+        self.content_weight = content_weight
+
+        # 키워드 전체를 정규식 하나로 묶는다 (겹치는 키워드는 긴 것부터 맞춘다)
+        keywords = sorted(self.weights, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(re.escape(keyword) for keyword in keywords)) if keywords else None
+
+        self._scores = {}
+        self._lock = threading.Lock()
+
+    def _score_texts(self, texts):
+        if self.pattern is None or texts.empty:
+            return pd.DataFrame({'sum': 0.0, 'max': 0.0}, index=texts.index)
+
+        # 기사마다 맞은 키워드를 한 번에 뽑아 가중치의 합(빈도)과 최댓값(가장 중요한 키워드)을 구한다
+        matches = texts.fillna('').astype(str).reset_index(drop=True).str.findall(self.pattern).explode()
+        weights = matches.map(self.weights).fillna(0.0).groupby(level=0).agg(['sum', 'max'])
+
+        return weights.set_axis(texts.index).astype('float64')
+
+    def score(self, df, id_column='URL', title_column='제목', content_column='내용'):
+
+        # 우선순위: 기사에 나온 가장 중요한 키워드의 가중치, 중요도: 제목/본문 빈도를 더한 점수
+        ids = df[id_column].astype(str)
+
+        # 이미 점수를 매긴 기사는 다시 계산하지 않는다
+        with self._lock:
+            known = ids.isin(self._scores).to_numpy()
+        new_df = df[~known]
+        if not new_df.empty:
+            title = self._score_texts(new_df[title_column])
+            content = self._score_texts(new_df[content_column])
+            priorities = np.maximum(title['max'].to_numpy(), content['max'].to_numpy())
+            totals = title['sum'].to_numpy() * self.title_weight + content['sum'].to_numpy() * self.content_weight
+            with self._lock:
+                self._scores.update(zip(ids[~known], zip(priorities, totals)))
+
+        with self._lock:
+            scores = [self._scores[article_id] for article_id in ids]
+            # 조회 범위(최근 기사)에서 빠진 기사는 잊는다
+            self._scores = dict(zip(ids, scores))
+
+        return pd.DataFrame(scores, index=df.index, columns=['우선순위', '중요도'], dtype='float64')
+
+    def order(self, df, id_column='URL', title_column='제목', content_column='내용'):
+
+        # 더 중요한 키워드가 나온 기사가 먼저, 같은 키워드 사이에서만 빈도로 가른다 (동점은 기존 순서 유지)
+        scores = self.score(df, id_column, title_column, content_column)
+
+        return np.lexsort((-scores['중요도'].to_numpy(), -scores['우선순위'].to_numpy()))
+
+    def spans(self, text):
+        if self.pattern is None or not isinstance(text, str):
+            return []
+
+        return [(match.start(), match.end(), match.group()) for match in self.pattern.finditer(text)]
+
+    def highlight(self, text, marker='**'):
+        if self.pattern is None or not isinstance(text, str):
+            return text
+
+        return self.pattern.sub(lambda match: f"{marker}{match.group()}{marker}", text)
+
+    def top_k(self, df, k=10, id_column='URL', title_column='제목', content_column='내용'):
+
+        # 점수 순으로 k건만 고르고, 하이라이트 위치는 고른 기사에만 계산
+        scores = self.score(df, id_column, title_column, content_column)
+        positions = np.lexsort((-scores['중요도'].to_numpy(), -scores['우선순위'].to_numpy()))
+        positions = positions[scores['우선순위'].to_numpy()[positions] > 0][:k]
+        top = df.iloc[positions].assign(
+            우선순위=scores['우선순위'].to_numpy()[positions],
+            중요도=scores['중요도'].to_numpy()[positions],
+        )
+
+        return top.assign(
+            제목_매칭=top[title_column].map(self.spans),
+            내용_매칭=top[content_column].map(self.spans),
+        )
+
+@functools.lru_cache(maxsize=4)
+def get_keyword_ranker(weights):
+    # weights: ((키워드, 가중치), ...) - 같은 설정이면 점수 캐시를 공유
+    return KeywordRanker(dict(weights))
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+
+import pandas as pd
+
+import utils
+import search_utils
+
+BUDGET_ROLLUP_LEVELS = ['지역명', '자치단체명']
+BUDGET_ROLLUP_MEASURES = ['예산현액', '국비', '시도비', '시군구비', '지출액']
+
+EDU_BUDGET_ROLLUP_LEVELS = ['도광역시', '시군구', '구분']
+EDU_BUDGET_ROLLUP_MEASURES = ['금액']
+
+ALL = '(전체)'
+
+class RollupCube:
+
+    def __init__(self, df, levels, measures):
+        self.levels = list(levels)
+        self.measures = list(measures)
+
+        # 가장 세밀한 단위의 합계만 한 번 계산하고, 상위 단위는 이 표를 다시 묶어 답한다
+        values = df[self.measures].apply(lambda series: pd.to_numeric(series, errors='coerce')).astype('float64')
+        values['건수'] = 1
+        keys = [df[level].astype(str).where(df[level].notna(), '') for level in self.levels]
+
+        self.base = values.groupby(keys, sort=True).sum().reset_index()
+
+    def rollup(self, depth, filters=None):
+
+        # depth: 묶을 단계 수 (0이면 전체 합계), filters: {단계: 값} 드릴다운 경로
+        base = self.base
+        for level, value in (filters or {}).items():
+            base = base[base[level] == value]
+
+        columns = self.measures + ['건수']
+        if depth == 0:
+            return base[columns].sum().to_frame().T
+
+        return base.groupby(self.levels[:depth], sort=True)[columns].sum().reset_index()
+
+    def drill_down(self, path):
+        # path: 상위 단계부터 고른 값들 -> 바로 아래 단계별 합계
+        return self.rollup(len(path) + 1, dict(zip(self.levels, path)))
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def _get_budget_rollup(collection_date, partition_stamp):
+    collection_day = pd.to_datetime(collection_date).date()
+    snapshot_df = utils.get_dataframe_from_bigquery_by_date(
+        'DATA_WAREHOUSE', 'budget_data', collection_day, collection_day, BUDGET_ROLLUP_LEVELS + BUDGET_ROLLUP_MEASURES
+    )
+    snapshot_df = utils.coerce_dataframe(snapshot_df, 'budget_data')
+
+    return RollupCube(snapshot_df, BUDGET_ROLLUP_LEVELS, BUDGET_ROLLUP_MEASURES)
+
+def get_budget_rollup(collection_date=None):
+
+    # 수집일마다 따로 만들어 두므로 새 수집일이 들어오거나 그 날짜가 다시 수집되면 그 날짜 분만 새로 계산한다
+    meta = utils.sync_table_by_date('DATA_WAREHOUSE', 'budget_data')
+    partition_rows = meta.get('partition_rows', {})
+    if not partition_rows:
+        return None, None
+
+    collection_date = collection_date or max(partition_rows)
+    partition_stamp = utils.get_date_partition_stamp('DATA_WAREHOUSE', 'budget_data', collection_date)
+
+    return collection_date, _get_budget_rollup(collection_date, partition_stamp)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _get_edu_budget_rollup(_edu_budget_df, token):
+    return RollupCube(_edu_budget_df, EDU_BUDGET_ROLLUP_LEVELS, EDU_BUDGET_ROLLUP_MEASURES)
+
+def get_edu_budget_rollup():
+    edu_budget_df = utils.load_edu_budget_data()
+
+    return _get_edu_budget_rollup(edu_budget_df, search_utils.frame_token(edu_budget_df))
+
+def rollup_summary(cube, key_prefix):
+
+    depth = st.radio('집계 단위', cube.levels, horizontal=True, key=f'{key_prefix}_rollup_level')
+    depth = cube.levels.index(depth) + 1
+
+    # 위 단계에서 고른 값으로 범위를 좁혀 내려간다
+    path = []
+    if depth > 1:
+        columns = st.columns(depth - 1)
+        for level_index, level in enumerate(cube.levels[:depth - 1]):
+            options = cube.drill_down(path)[level].tolist()
+            with columns[level_index]:
+                value = st.selectbox(level, [ALL] + options, key=f'{key_prefix}_rollup_{level}')
+            if value == ALL:
+                break
+            path.append(value)
+
+    filters = dict(zip(cube.levels, path))
+
+    total = cube.rollup(0, filters).iloc[0]
+    metric_columns = st.columns(len(cube.measures))
+    for measure, metric_column in zip(cube.measures, metric_columns):
+        metric_column.metric(measure, f"{total[measure]:,.0f}")
+
+    summary_df = cube.rollup(depth, filters)
+    st.dataframe(summary_df, hide_index=True, column_config={
+        column: st.column_config.NumberColumn(format='%d') for column in cube.measures + ['건수']
+    })
+
+    return summary_df
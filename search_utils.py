@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+
+import numpy as np
+import pandas as pd
+import hashlib
+
+# 정규식 특수문자가 들어간 검색어는 색인 대신 정규식으로 처리
+REGEX_SPECIAL_CHARACTERS = set('.^$*+?{}[]\\|()')
+
+def _ordered_hash(values):
+    # 원소별 해시를 이어 붙여 해시 (합과 달리 행 순서가 바뀌면 값이 달라진다)
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+def frame_token(df, column=None):
+    # 로더가 남긴 데이터 버전 + 행 구성으로 프레임을 구분
+    version = df.attrs.get('dataset_version')
+    token = (version, len(df), _ordered_hash(df.index))
+
+    # 버전 정보가 없는 프레임(CSV 업로드 등)은 열 내용까지 해시
+    if version is None and column is not None:
+        token += (_ordered_hash(df[column]),)
+
+    return token
+
+# 한글 음절 분해표 (겹모음/겹받침은 낱자로 풀어 입력 중인 글자도 맞도록)
+CHOSEONG = ['ㄱ', 'ㄲ', 'ㄴ', 'ㄷ', 'ㄸ', 'ㄹ', 'ㅁ', 'ㅂ', 'ㅃ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅉ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+JUNGSEONG = ['ㅏ', 'ㅐ', 'ㅑ', 'ㅒ', 'ㅓ', 'ㅔ', 'ㅕ', 'ㅖ', 'ㅗ', 'ㅗㅏ', 'ㅗㅐ', 'ㅗㅣ', 'ㅛ', 'ㅜ', 'ㅜㅓ', 'ㅜㅔ', 'ㅜㅣ', 'ㅠ', 'ㅡ', 'ㅡㅣ', 'ㅣ']
+JONGSEONG = ['', 'ㄱ', 'ㄲ', 'ㄱㅅ', 'ㄴ', 'ㄴㅈ', 'ㄴㅎ', 'ㄷ', 'ㄹ', 'ㄹㄱ', 'ㄹㅁ', 'ㄹㅂ', 'ㄹㅅ', 'ㄹㅌ', 'ㄹㅍ', 'ㄹㅎ', 'ㅁ', 'ㅂ', 'ㅂㅅ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+COMPOUND_JAMO = {
+    'ㅘ': 'ㅗㅏ', 'ㅙ': 'ㅗㅐ', 'ㅚ': 'ㅗㅣ', 'ㅝ': 'ㅜㅓ', 'ㅞ': 'ㅜㅔ', 'ㅟ': 'ㅜㅣ', 'ㅢ': 'ㅡㅣ',
+    'ㄳ': 'ㄱㅅ', 'ㄵ': 'ㄴㅈ', 'ㄶ': 'ㄴㅎ', 'ㄺ': 'ㄹㄱ', 'ㄻ': 'ㄹㅁ', 'ㄼ': 'ㄹㅂ', 'ㄽ': 'ㄹㅅ',
+    'ㄾ': 'ㄹㅌ', 'ㄿ': 'ㄹㅍ', 'ㅀ': 'ㄹㅎ', 'ㅄ': 'ㅂㅅ',
+}
+
+# str.translate로 한 번에 분해하도록 음절 코드별 변환표를 미리 만든다
+JAMO_TABLE = {ord(jamo): split for jamo, split in COMPOUND_JAMO.items()}
+CHOSEONG_TABLE = {}
+for syllable_index in range(11172):
+    cho, rest = divmod(syllable_index, 588)
+    jung, jong = divmod(rest, 28)
+    JAMO_TABLE[0xAC00 + syllable_index] = CHOSEONG[cho] + JUNGSEONG[jung] + JONGSEONG[jong]
+    CHOSEONG_TABLE[0xAC00 + syllable_index] = CHOSEONG[cho]
+
+def to_jamo(text):
+    return text.translate(JAMO_TABLE)
+
+def to_choseong(text):
+    return text.translate(CHOSEONG_TABLE)
+
+def is_choseong_query(text):
+    return len(text) > 0 and all('ㄱ' <= char <= 'ㅎ' for char in text)
+
+class NgramIndex:
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+        self.lowered = [value.lower() for value in self.values]
+
+        postings = {}
+        for value_id, text in enumerate(self.lowered):
+            grams = set(text)
+            grams.update(text[i:i + 2] for i in range(len(text) - 1))
+            for gram in grams:
+                postings.setdefault(gram, []).append(value_id)
+
+        self.postings = {gram: np.asarray(value_ids, dtype=np.int32) for gram, value_ids in postings.items()}
+
+    @classmethod
+    def from_series(cls, series, transform=None):
+        # 같은 문자열은 한 번만 색인하고 행은 코드로 연결
+        codes, uniques = pd.factorize(series)
+        values = pd.Series(uniques, dtype=object).astype(str)
+
+        # 초성/자모 색인은 고유값만 미리 분해해 둔다
+        if transform is not None:
+            values = values.map(transform)
+
+        return cls(codes, values)
+
+    def _candidate_values(self, term):
+        grams = {term[i:i + 2] for i in range(len(term) - 1)} or {term}
+
+        posting_lists = [self.postings.get(gram) for gram in grams]
+        if any(posting_list is None for posting_list in posting_lists):
+            return np.empty(0, dtype=np.int32)
+
+        # 짧은 목록부터 교집합
+        posting_lists.sort(key=len)
+        value_ids = posting_lists[0]
+        for posting_list in posting_lists[1:]:
+            value_ids = np.intersect1d(value_ids, posting_list, assume_unique=True)
+
+        return value_ids
+
+    def matching_values(self, term):
+        if REGEX_SPECIAL_CHARACTERS & set(term):
+            return np.flatnonzero(self.values.str.contains(term, case=False, na=False).to_numpy())
+
+        # 후보 문자열만 실제 포함 여부를 확인 (bigram 교집합은 후보를 넓게 잡는다)
+        lowered_term = term.lower()
+        candidates = self._candidate_values(lowered_term)
+
+        return np.asarray([value_id for value_id in candidates if lowered_term in self.lowered[value_id]], dtype=np.int32)
+
+    def search(self, terms):
+        matched = None
+        for term in terms:
+            value_ids = self.matching_values(term)
+            matched = value_ids if matched is None else np.intersect1d(matched, value_ids)
+
+        if matched is None:
+            return np.arange(len(self.codes))
+
+        return np.flatnonzero(np.isin(self.codes, matched))
+
+class RangeIndex:
+
+    def __init__(self, values):
+        # 결측값은 범위 검색에서 빠지므로 정렬 대상에서도 제외 (결측 행 위치는 따로 보관)
+        missing = np.isnan(values)
+        positions = np.flatnonzero(~missing)
+        order = np.argsort(values[positions], kind='stable')
+
+        self.positions = positions[order]
+        self.sorted_values = values[self.positions]
+        self.missing_positions = np.flatnonzero(missing)
+        self._last_query = None
+
+    @classmethod
+    def from_series(cls, series):
+        values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        return cls(values)
+
+    @property
+    def min(self):
+        return float(self.sorted_values[0]) if len(self.sorted_values) else 0.0
+
+    @property
+    def max(self):
+        return float(self.sorted_values[-1]) if len(self.sorted_values) else 0.0
+
+    def positions_between(self, low, high):
+        # 값 순서대로의 행 위치 (정렬 상태 그대로 쓰는 쪽은 다시 정렬할 필요가 없다)
+        start = np.searchsorted(self.sorted_values, low, side='left')
+        stop = np.searchsorted(self.sorted_values, high, side='right')
+        return self.positions[start:stop]
+
+    def search(self, ranges):
+        # 여러 범위는 합집합 (OR), 결과는 원래 행 순서대로
+        ranges = tuple((float(low), float(high)) for low, high in ranges)
+
+        # 여러 세션이 같은 색인을 공유하므로 마지막 조회는 한 번만 읽어 비교한다
+        last_query = self._last_query
+        if last_query is not None and last_query[0] == ranges:
+            return last_query[1]
+
+        positions = np.unique(np.concatenate([self.positions_between(low, high) for low, high in ranges] or [np.empty(0, dtype=np.intp)]))
+        self._last_query = (ranges, positions)
+
+        return positions
+
+INDEX_TRANSFORMS = {
+    'plain': None,
+    'jamo': to_jamo,
+    'choseong': to_choseong,
+}
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _get_ngram_index(_series, token, kind):
+    return NgramIndex.from_series(_series, INDEX_TRANSFORMS[kind])
+
+def get_ngram_index(df, column, kind='plain'):
+    return _get_ngram_index(df[column], frame_token(df, column) + (column,), kind)
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _get_range_index(_series, token):
+    return RangeIndex.from_series(_series)
+
+def get_range_index(df, column):
+    return _get_range_index(df[column], frame_token(df, column) + (column,))
+
+def filter_range(df, column, *ranges):
+    # 정렬된 값에서 이진 탐색 두 번으로 범위에 드는 행을 찾는다
+    return df.iloc[get_range_index(df, column).search(ranges)]
+
+def search_positions(df, column, search_term, mode='plain'):
+    # 공백으로 나눈 검색어를 모두 포함하는 행 위치 (AND)
+    terms = search_term.split()
+    if not terms:
+        return np.arange(len(df))
+
+    if mode != 'jamo':
+        return get_ngram_index(df, column).search(terms)
+
+    # 초성만 입력하면 초성 색인, 그 외에는 자모 색인에서 찾는다 (입력 중인 글자 포함)
+    positions = None
+    for term in terms:
+        if is_choseong_query(term):
+            term_positions = get_ngram_index(df, column, 'choseong').search([term])
+        else:
+            term_positions = get_ngram_index(df, column, 'jamo').search([to_jamo(term)])
+        positions = term_positions if positions is None else np.intersect1d(positions, term_positions)
+
+    return positions
+
+def search_dataframe(df, column, search_term, mode='plain'):
+    if not search_term.split():
+        return df
+
+    return df.iloc[search_positions(df, column, search_term, mode)]
@@ -1,420 +1,1672 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 import pandas_gbq
 from datetime import datetime, timedelta
 import pytz
+import io
 import json
-from shapely import wkt
+import os
+import sys
+import shutil
+import hashlib
+import time
+import queue
+import atexit
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import uuid
+import requests
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import shapely
+from streamlit.runtime.scriptrunner import get_script_run_ctx, add_script_run_ctx
 from google.cloud import bigquery
 from google.oauth2 import service_account
+from google.auth.transport.requests import AuthorizedSession
+
+import ranking_utils
+import search_utils
+
+try:
+    from google.cloud import bigquery_storage
+except ImportError:  # Storage API 패키지가 없으면 list_rows/query 경로로 대체
+    bigquery_storage = None
+
+try:
+    import resource
+except ImportError:  # 윈도우에는 resource 모듈이 없으므로 최대 메모리 표시를 생략
+    resource = None
 
 import warnings
 warnings.filterwarnings("ignore")
 
 credentials = service_account.Credentials.from_service_account_info(st.secrets["gcp_service_account"])
 
-def save_dataframe_to_bigquery(df, dataset_id, table_id):
+# 프로세스 전체에서 공유하는 빅쿼리 클라이언트 (인증/HTTP 커넥션 재사용)
+BIGQUERY_POOL_MAXSIZE = 16
+
+_bigquery_client = None
+_bigquery_storage_client = None
+_bigquery_http_adapter = None
+_bigquery_client_lock = threading.Lock()
+
+def create_bigquery_client(client_credentials, project, api_endpoint=None):
+
+    # 토큰 갱신은 AuthorizedSession이 담당하고, 커넥션은 어댑터 풀에서 재사용
+    http_adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=BIGQUERY_POOL_MAXSIZE)
+    http_session = AuthorizedSession(client_credentials)
+    http_session.mount('https://', http_adapter)
+    http_session.mount('http://', http_adapter)
+
+    # api_endpoint: 벤치마크의 로컬 가짜 서버 등 다른 주소로 보낼 때
+    client_options = {'api_endpoint': api_endpoint} if api_endpoint else None
+    client = bigquery.Client(credentials=client_credentials, project=project, client_options=client_options, _http=http_session)
+
+    return client, http_adapter
+
+def get_bigquery_client():
+    global _bigquery_client, _bigquery_http_adapter
+
+    if _bigquery_client is None:
+        # 스트림릿 스크립트 스레드가 동시에 들어와도 클라이언트는 한 번만 생성
+        with _bigquery_client_lock:
+            if _bigquery_client is None:
+                _bigquery_client, _bigquery_http_adapter = create_bigquery_client(credentials, credentials.project_id)
+
+    return _bigquery_client
+
+def get_bigquery_storage_client():
+    global _bigquery_storage_client
+
+    if bigquery_storage is None:
+        return None
+
+    if _bigquery_storage_client is None:
+        with _bigquery_client_lock:
+            if _bigquery_storage_client is None:
+                _bigquery_storage_client = bigquery_storage.BigQueryReadClient(credentials=credentials)
+
+    return _bigquery_storage_client
+
+def get_bigquery_pool_stats(http_adapter=None):
+    stats = {'connections_opened': 0, 'connections_idle': 0, 'requests': 0, 'connections_reused': 0}
+
+    http_adapter = http_adapter or _bigquery_http_adapter
+    if http_adapter is None:
+        return stats
+
+    pools = http_adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools[key]
+        if pool is None:
+            continue
+        stats['connections_opened'] += pool.num_connections
+        stats['requests'] += pool.num_requests
+        # 큐에는 빈 자리(None)도 들어 있으므로 실제 커넥션만 센다
+        stats['connections_idle'] += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+
+    stats['connections_reused'] = max(stats['requests'] - stats['connections_opened'], 0)
+
+    return stats
+
+# 한 번에 Parquet로 직렬화해 적재하는 최대 크기 (원본 프레임 기준)
+SAVE_CHUNK_BYTES = 64 * 1024 ** 2
+
+def _bigquery_field(column, series):
+    dtype = series.dtype
+
+    if pd.api.types.is_bool_dtype(dtype):
+        return bigquery.SchemaField(column, 'BOOLEAN'), pa.bool_()
+    if pd.api.types.is_integer_dtype(dtype):
+        return bigquery.SchemaField(column, 'INTEGER'), pa.int64()
+    if pd.api.types.is_float_dtype(dtype):
+        return bigquery.SchemaField(column, 'FLOAT'), pa.float64()
+    # Arrow date32도 is_datetime64_any_dtype가 참이므로 먼저 확인
+    if str(dtype).startswith('date32'):
+        return bigquery.SchemaField(column, 'DATE'), pa.date32()
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        if getattr(dtype, 'tz', None) is not None:
+            return bigquery.SchemaField(column, 'TIMESTAMP'), pa.timestamp('us', tz='UTC')
+        return bigquery.SchemaField(column, 'DATETIME'), pa.timestamp('us')
+
+    # 카테고리/혼합 타입 열은 문자열로 저장 (결측은 NULL)
+    return bigquery.SchemaField(column, 'STRING'), pa.string()
+
+def _chunk_to_arrow(chunk, arrow_schema):
+    arrays = []
+    for field in arrow_schema:
+        series = chunk[field.name]
+        if pa.types.is_string(field.type):
+            series = series.astype('string')
+        arrays.append(pa.array(series, type=field.type, from_pandas=True))
+
+    return pa.Table.from_arrays(arrays, schema=arrow_schema)
+
+def save_dataframe_to_bigquery(df, dataset_id, table_id, write_mode='truncate'):
+
+    # write_mode: 'truncate' (임시 테이블에 모두 적재한 뒤 한 번에 교체) / 'append' (기존 행 뒤에 추가)
+    client = get_bigquery_client()
+    target_id = f"{client.project}.{dataset_id}.{table_id}"
+
+    # 열 타입을 그대로 살린 명시적 스키마 (원본 프레임은 바꾸지 않는다)
+    schema_fields = [_bigquery_field(column, df[column]) for column in df.columns]
+    fields = [field for field, _ in schema_fields]
+    arrow_schema = pa.schema([pa.field(field.name, arrow_type) for field, arrow_type in schema_fields])
+
+    # 원본 크기 기준으로 조각 크기를 정해 직렬화 버퍼가 한도를 넘지 않게 한다
+    row_bytes = df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
+    chunk_rows = max(1, int(SAVE_CHUNK_BYTES // max(row_bytes, 1)))
+    chunk_starts = range(0, max(len(df), 1), chunk_rows)
+
+    # 한 조각으로 끝나는 덮어쓰기는 적재 작업 하나로 교체된다
+    staged = write_mode == 'truncate' and len(chunk_starts) > 1
+    if staged:
+        load_id = f"{client.project}.{dataset_id}.{table_id}_staging_{uuid.uuid4().hex}"
+        staging_table = bigquery.Table(load_id, schema=fields)
+        staging_table.expires = datetime.now(pytz.utc) + timedelta(hours=1)
+        client.create_table(staging_table)
+    else:
+        load_id = target_id
+
+    started_at = time.monotonic()
+    total_bytes = 0
+
+    try:
+        for chunk_index, start in enumerate(chunk_starts):
+            # 조각마다 Arrow로 변환해 Parquet로 직렬화 (iloc 조각은 원본을 복사하지 않는다)
+            buffer = io.BytesIO()
+            pq.write_table(_chunk_to_arrow(df.iloc[start:start + chunk_rows], arrow_schema), buffer)
+            total_bytes += buffer.tell()
+            buffer.seek(0)
+
+            if write_mode == 'append' or chunk_index > 0:
+                write_disposition = "WRITE_APPEND"
+            else:
+                write_disposition = "WRITE_TRUNCATE"
+
+            job_config = bigquery.LoadJobConfig(
+                schema=fields,
+                source_format=bigquery.SourceFormat.PARQUET,
+                write_disposition=write_disposition,
+            )
+            client.load_table_from_file(buffer, load_id, job_config=job_config).result()
+
+        if staged:
+            # 다 적재된 임시 테이블로 한 번에 교체 (읽는 쪽은 반쯤 쓴 테이블을 보지 않는다)
+            copy_config = bigquery.CopyJobConfig(write_disposition="WRITE_TRUNCATE")
+            client.copy_table(load_id, target_id, job_config=copy_config).result()
+    finally:
+        if staged:
+            client.delete_table(load_id, not_found_ok=True)
+        invalidate_table_version(dataset_id, table_id)
+
+    elapsed = max(time.monotonic() - started_at, 1e-6)
+    stats = {'rows': len(df), 'bytes': total_bytes, 'chunks': len(chunk_starts), 'seconds': elapsed}
+
+    print(f"Data inserted into table {table_id} successfully: {len(df)} rows, {total_bytes / 1024 ** 2:.1f}MB in {len(chunk_starts)} chunks, "
+          f"{elapsed:.1f}s ({len(df) / elapsed:,.0f} rows/s, {total_bytes / 1024 ** 2 / elapsed:.1f}MB/s).")
+
+    return stats
+
+# 행 단위 저장(MERGE)에 사용하는 고유 행 ID와 행 버전 열
+ROW_ID_COLUMN = 'row_id'
+ROW_VERSION_COLUMN = 'row_version'
+# 임시 테이블에서 이번 세션에 새로 만든 행을 표시하는 버전 값
+NEW_ROW_VERSION = -1
+
+_row_id_tables = set()
+
+def ensure_row_ids(dataset_id, table_id):
+
+    table_key = f"{dataset_id}.{table_id}"
+    if table_key in _row_id_tables:
+        return
+
+    client = get_bigquery_client()
+
+    table = client.get_table(f"{client.project}.{table_key}")
+    column_names = {field.name for field in table.schema}
+
+    # 행 ID/버전 열이 없는 기존 테이블은 한 번만 열을 추가하고 값을 채운다
+    if ROW_ID_COLUMN not in column_names or ROW_VERSION_COLUMN not in column_names:
+        client.query(f"""
+        ALTER TABLE `{table_key}`
+        ADD COLUMN IF NOT EXISTS {ROW_ID_COLUMN} STRING,
+        ADD COLUMN IF NOT EXISTS {ROW_VERSION_COLUMN} INT64
+        """).result()
+
+        client.query(f"""
+        UPDATE `{table_key}`
+        SET {ROW_ID_COLUMN} = IFNULL({ROW_ID_COLUMN}, GENERATE_UUID()),
+            {ROW_VERSION_COLUMN} = IFNULL({ROW_VERSION_COLUMN}, 0)
+        WHERE {ROW_ID_COLUMN} IS NULL OR {ROW_VERSION_COLUMN} IS NULL
+        """).result()
+
+    _row_id_tables.add(table_key)
+
+def _missing_row_ids(df):
+    if ROW_ID_COLUMN not in df.columns:
+        return pd.Series(True, index=df.index)
+
+    return df[ROW_ID_COLUMN].isna() | (df[ROW_ID_COLUMN].astype(str).isin(['', 'nan', 'None']))
+
+def assign_row_ids(df):
+
+    df = df.copy()
+
+    if ROW_ID_COLUMN not in df.columns:
+        df[ROW_ID_COLUMN] = None
+    if ROW_VERSION_COLUMN not in df.columns:
+        df[ROW_VERSION_COLUMN] = 0
+
+    # 행 ID가 없는 행(새 행, CSV 업로드 행)에만 새 ID 부여
+    missing = _missing_row_ids(df)
+    df.loc[missing, ROW_ID_COLUMN] = [uuid.uuid4().hex for _ in range(missing.sum())]
+    df[ROW_VERSION_COLUMN] = pd.to_numeric(df[ROW_VERSION_COLUMN], errors='coerce').fillna(0).astype('int64')
+
+    return df
+
+def diff_edited_rows(original_df, edited_df):
+
+    # 편집기에서 새로 추가된 행 (원본에 없는 인덱스)
+    inserted = ~edited_df.index.isin(original_df.index)
+
+    # 원본에 있던 행은 값이 하나라도 바뀐 경우만 변경으로 본다 (NaN끼리는 같은 값)
+    existing_index = edited_df.index[~inserted]
+    before = original_df.loc[existing_index, edited_df.columns].astype(object)
+    after = edited_df.loc[existing_index].astype(object)
+    unchanged = ((before == after) | (before.isna() & after.isna())).all(axis=1)
+
+    changed_index = existing_index[~unchanged.to_numpy()].append(edited_df.index[inserted])
+
+    return edited_df.loc[changed_index]
+
+def _cast_to_table_schema(df, schema):
+
+    fields = [field for field in schema if field.name in df.columns]
+    df = df[[field.name for field in fields]].copy()
+
+    # 대상 테이블의 열 타입에 맞춰 변환 (문자열 열은 기존 저장 방식과 동일하게 정리)
+    for field in fields:
+        if field.field_type == 'STRING':
+            df[field.name] = df[field.name].astype(str).replace('nan', '').replace('None', '').replace('<NA>', '').replace('NaT', '')
+        elif field.field_type in ('INTEGER', 'INT64'):
+            df[field.name] = pd.to_numeric(df[field.name], errors='coerce').astype('Int64')
+        elif field.field_type in ('FLOAT', 'FLOAT64', 'NUMERIC'):
+            df[field.name] = pd.to_numeric(df[field.name], errors='coerce')
+        elif field.field_type in ('BOOLEAN', 'BOOL'):
+            df[field.name] = df[field.name].astype('boolean')
+
+    return df, fields
+
+def upsert_dataframe_to_bigquery(df, dataset_id, table_id):
+
+    if df.empty:
+        return []
+
+    ensure_row_ids(dataset_id, table_id)
+
+    client = get_bigquery_client()
+
+    table_key = f"{dataset_id}.{table_id}"
+    target_table = client.get_table(f"{client.project}.{table_key}")
+
+    # 행 ID가 없던 행만 새 행으로 넣는다 (ID가 있는데 대상에 없는 행은 그 사이 지워진 행)
+    new_rows = _missing_row_ids(df).to_numpy()
+    staging_df = assign_row_ids(df)
+    staging_df.loc[new_rows, ROW_VERSION_COLUMN] = NEW_ROW_VERSION
+    staging_df, fields = _cast_to_table_schema(staging_df, target_table.schema)
+
+    # 변경된 행만 임시 테이블에 적재 (1시간 뒤 자동 만료)
+    staging_id = f"{client.project}.{dataset_id}.{table_id}_staging_{uuid.uuid4().hex}"
+    staging_table = bigquery.Table(staging_id, schema=fields)
+    staging_table.expires = datetime.now(pytz.utc) + timedelta(hours=1)
+    client.create_table(staging_table)
+
+    job_config = bigquery.LoadJobConfig(schema=fields, write_disposition="WRITE_TRUNCATE")
+    client.load_table_from_dataframe(staging_df, staging_id, job_config=job_config).result()
+
+    value_columns = [field.name for field in fields if field.name not in (ROW_ID_COLUMN, ROW_VERSION_COLUMN)]
+    update_clause = ', '.join(f"`{column}` = S.`{column}`" for column in value_columns)
+    insert_columns = ', '.join(f"`{column}`" for column in value_columns)
+    insert_values = ', '.join(f"S.`{column}`" for column in value_columns)
+
+    # 행 버전이 그대로인 행만 갱신하고, 그 사이 다른 사용자가 바꾸거나 지운 행은 충돌로 돌려준다
+    script = f"""
+    BEGIN TRANSACTION;
+
+    CREATE TEMP TABLE conflicts AS
+    SELECT S.{ROW_ID_COLUMN}
+    FROM `{staging_id}` AS S
+    LEFT JOIN `{table_key}` AS T
+    ON T.{ROW_ID_COLUMN} = S.{ROW_ID_COLUMN}
+    WHERE S.{ROW_VERSION_COLUMN} != {NEW_ROW_VERSION}
+    AND (T.{ROW_ID_COLUMN} IS NULL OR T.{ROW_VERSION_COLUMN} != S.{ROW_VERSION_COLUMN});
+
+    MERGE `{table_key}` AS T
+    USING `{staging_id}` AS S
+    ON T.{ROW_ID_COLUMN} = S.{ROW_ID_COLUMN}
+    WHEN MATCHED AND T.{ROW_VERSION_COLUMN} = S.{ROW_VERSION_COLUMN} THEN
+      UPDATE SET {update_clause}, {ROW_VERSION_COLUMN} = S.{ROW_VERSION_COLUMN} + 1
+    WHEN NOT MATCHED BY TARGET AND S.{ROW_VERSION_COLUMN} = {NEW_ROW_VERSION} THEN
+      INSERT ({insert_columns}, {ROW_ID_COLUMN}, {ROW_VERSION_COLUMN})
+      VALUES ({insert_values}, S.{ROW_ID_COLUMN}, 0);
+
+    COMMIT TRANSACTION;
+
+    SELECT {ROW_ID_COLUMN} FROM conflicts;
+    """
+
+    try:
+        conflicts = [row[ROW_ID_COLUMN] for row in client.query(script).result()]
+    finally:
+        client.delete_table(staging_id, not_found_ok=True)
+        invalidate_table_version(dataset_id, table_id)
+
+    print(f"{len(staging_df) - len(conflicts)} rows merged into table {table_id} ({len(conflicts)} conflicts).")
+
+    return conflicts
+
+def read_arrow_table_from_bigquery(dataset_id, table_id, columns=None, row_filter=None):
+
+    client = get_bigquery_client()
+    read_client = get_bigquery_storage_client()
+
+    if read_client is None:
+        # Storage API를 쓸 수 없으면 필요한 열만 조회하는 쿼리로 대체
+        select_columns = ', '.join(f'`{column}`' for column in columns) if columns else '*'
+        where_clause = f"WHERE {row_filter}" if row_filter else ''
+        query = f"SELECT {select_columns} FROM `{dataset_id}.{table_id}` {where_clause}"
+
+        return client.query(query).to_arrow()
+
+    # 필요한 열과 행 조건만 서버에서 걸러서 Arrow 레코드 배치로 받는다
+    requested_session = bigquery_storage.types.ReadSession(
+        table=f"projects/{client.project}/datasets/{dataset_id}/tables/{table_id}",
+        data_format=bigquery_storage.types.DataFormat.ARROW,
+        read_options=bigquery_storage.types.ReadSession.TableReadOptions(
+            selected_fields=list(columns or []),
+            row_restriction=row_filter or '',
+        ),
+    )
+    session = read_client.create_read_session(
+        parent=f"projects/{client.project}",
+        read_session=requested_session,
+        max_stream_count=1,
+    )
+
+    schema = pa.ipc.read_schema(pa.py_buffer(session.arrow_schema.serialized_schema))
+
+    batches = []
+    for stream in session.streams:
+        reader = read_client.read_rows(stream.name)
+        for page in reader.rows(session).pages:
+            batches.append(page.to_arrow())
+
+    return pa.Table.from_batches(batches, schema=schema)
 
-    # 빅쿼리 클라이언트 객체 생성
-    client = bigquery.Client(credentials=credentials)
+# 로컬 디스크 캐시 (Arrow IPC 파일, 재시작/배포 후에도 유지)
+DATA_CACHE_DIR = os.environ.get('DATA_CACHE_DIR', '.data_cache')
+DATA_CACHE_MAX_BYTES = int(os.environ.get('DATA_CACHE_MAX_BYTES', 5 * 1024 ** 3))
+# 계정/비밀번호 등 민감한 테이블은 디스크에 남기지 않는다
+DATA_CACHE_EXCLUDED_TABLES = {('SERVICE_DATA', 'users')}
 
-    # 테이블 레퍼런스 생성
-    table_ref = client.dataset(dataset_id).table(table_id)
+_data_cache_lock = threading.Lock()
 
-    # 'bool' 타입 열을 제외한 나머지 열에 대한 처리
-    non_bool_columns = df.select_dtypes(exclude=['bool']).columns
-    df[non_bool_columns] = df[non_bool_columns].astype(str).replace('nan', '').replace('None', '').replace('', '')
+# 테이블 버전(메타데이터) 확인 주기
+TABLE_VERSION_CHECK_INTERVAL = 30  # 초
 
-    # 'bool' 타입 열에 대한 처리 (변환 없이 그대로 유지)
-    bool_columns = df.select_dtypes(include=['bool']).columns
-    df[bool_columns] = df[bool_columns]
+_table_versions = {}
+_table_version_lock = threading.Lock()
 
-    # 데이터프레임을 BigQuery 테이블에 적재
-    job_config = bigquery.LoadJobConfig()
-    job_config.write_disposition = "WRITE_TRUNCATE"  # 기존 테이블 내용 삭제 후 삽입
+def get_table_version(dataset_id, table_id, watermark_column=None):
 
-    job = client.load_table_from_dataframe(df, table_ref, job_config=job_config)
-    job.result()  # 작업 완료 대기
+    table_key = (dataset_id, table_id, watermark_column)
 
-    print(f"Data inserted into table {table_id} successfully.")
+    # 확인 주기 안에서는 마지막으로 확인한 버전을 그대로 사용
+    with _table_version_lock:
+        checked = _table_versions.get(table_key)
+    if checked is not None and time.monotonic() - checked[0] < TABLE_VERSION_CHECK_INTERVAL:
+        return checked[1]
 
-def get_dataframe_from_bigquery(dataset_id, table_id):
+    version = fetch_table_version(dataset_id, table_id, watermark_column)
+    remember_table_version(dataset_id, table_id, version, watermark_column)
 
-    # BigQuery 클라이언트 생성
-    client = bigquery.Client(credentials=credentials, project=credentials.project_id)
+    return version
 
-    # 테이블 레퍼런스 생성
-    table_ref = client.dataset(dataset_id).table(table_id)
+def remember_table_version(dataset_id, table_id, version, watermark_column=None):
+    with _table_version_lock:
+        _table_versions[(dataset_id, table_id, watermark_column)] = (time.monotonic(), version)
 
-    # 테이블 데이터를 DataFrame으로 변환
-    df = client.list_rows(table_ref).to_dataframe()
+def fetch_table_version(dataset_id, table_id, watermark_column=None):
+
+    client = get_bigquery_client()
+
+    if watermark_column is not None:
+        # 워터마크 열의 최댓값과 행 수로 변경 여부 판단
+        query = f"SELECT CAST(MAX(`{watermark_column}`) AS STRING) AS watermark, COUNT(*) AS num_rows FROM `{dataset_id}.{table_id}`"
+        row = list(client.query(query).result())[0]
+        version = f"{row['watermark']}|{row['num_rows']}"
+    else:
+        # 테이블 메타데이터(최종 수정 시각, 행 수)만 조회
+        table = client.get_table(f"{client.project}.{dataset_id}.{table_id}")
+
+        if table.table_type == 'VIEW':
+            # 뷰는 수정 시각이 원본 변경을 반영하지 않으므로 한 시간 단위로 갱신
+            version = f"view|{int(time.time() // 3600)}"
+        else:
+            version = f"{table.modified.isoformat()}|{table.num_rows}"
+
+    return version
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _get_table_num_bytes(dataset_id, table_id, version):
+    client = get_bigquery_client()
+    table = client.get_table(f"{client.project}.{dataset_id}.{table_id}")
+
+    # 뷰는 크기 정보가 없으므로 원본 테이블처럼 작다고 본다
+    return table.num_bytes or 0
+
+def get_table_num_bytes(dataset_id, table_id):
+    return _get_table_num_bytes(dataset_id, table_id, get_table_version(dataset_id, table_id))
+
+def invalidate_table_version(dataset_id, table_id):
+
+    # 이 앱에서 테이블에 쓴 직후에는 다음 조회 때 바로 메타데이터를 다시 확인
+    with _table_version_lock:
+        for table_key in [key for key in _table_versions if key[:2] == (dataset_id, table_id)]:
+            del _table_versions[table_key]
+
+def cache_by_table_version(*tables, daily=False, max_entries=4, shared=False):
+
+    # 테이블 버전이 바뀔 때만 다시 불러오는 st.cache_data 래퍼
+    # shared=True이면 st.cache_resource로 모든 세션이 같은 객체를 읽기 전용으로 공유 (호출한 쪽에서 수정 금지)
+    def decorator(func):
+
+        def cached(table_versions, *args, **kwargs):
+            result = func(*args, **kwargs)
+
+            # 검색 색인 등이 데이터 버전 단위로 캐시되도록 결과 프레임에 버전을 남긴다 (튜플 결과는 위치까지 구분)
+            for position, df in enumerate(result if isinstance(result, tuple) else (result,)):
+                if isinstance(df, pd.DataFrame):
+                    df.attrs['dataset_version'] = repr((func.__qualname__, table_versions, args, kwargs, position))
+
+            return result
+
+        # 스트림릿 캐시 키가 원래 함수 이름으로 구분되도록 이름을 맞춘다
+        cached.__module__ = func.__module__
+        cached.__name__ = func.__name__
+        cached.__qualname__ = func.__qualname__
+        cache = st.cache_resource if shared else st.cache_data
+        cached = cache(max_entries=max_entries, show_spinner=False)(cached)
+
+        def current_versions(version_getter=get_table_version):
+            table_versions = tuple(version_getter(*table) for table in tables)
+            if daily:
+                table_versions += (datetime.now().date().isoformat(),)
+
+            return table_versions
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cached(current_versions(), *args, **kwargs)
+
+        wrapper.clear = cached.clear
+        wrapper.tables = tables
+        wrapper.current_versions = current_versions
+        wrapper.warm = cached
+        wrapper.shared = shared
+
+        return wrapper
+
+    return decorator
+
+def _data_cache_path(dataset_id, table_id, columns, row_filter):
+    cache_key = json.dumps([dataset_id, table_id, list(columns or []), row_filter or ''], ensure_ascii=False)
+    digest = hashlib.sha1(cache_key.encode('utf-8')).hexdigest()
+
+    return os.path.join(DATA_CACHE_DIR, f"{dataset_id}.{table_id}.{digest}.arrow")
+
+def read_data_cache(cache_path, version):
+    try:
+        with open(cache_path + '.json', 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get('version') != version or not os.path.exists(cache_path):
+        return None
+
+    # LRU 정리를 위해 사용 시각 갱신
+    os.utime(cache_path)
+
+    # 메모리 매핑으로 읽어 파일 전체를 힙에 복사하지 않는다
+    with pa.memory_map(cache_path, 'r') as source:
+        arrow_table = pa.ipc.open_file(source).read_all()
+
+    return arrow_table
+
+def write_data_cache(cache_path, arrow_table, version):
+    os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+
+    # 다른 스레드/프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+    temp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+    with pa.OSFile(temp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+    os.replace(temp_path, cache_path)
+
+    with open(temp_path + '.json', 'w', encoding='utf-8') as file:
+        json.dump({'version': version}, file)
+    os.replace(temp_path + '.json', cache_path + '.json')
+
+    evict_data_cache()
+
+def _directory_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+def evict_data_cache(max_bytes=DATA_CACHE_MAX_BYTES):
+
+    with _data_cache_lock:
+        entries = []
+        for name in os.listdir(DATA_CACHE_DIR):
+            path = os.path.join(DATA_CACHE_DIR, name)
+            try:
+                if name.endswith('.arrow'):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                elif name.endswith('.by_date'):
+                    # 날짜별 사본은 폴더 전체를 한 항목으로 보고 마지막 동기화/조회 시각(sync.json)으로 정렬
+                    mtime = os.stat(os.path.join(path, 'sync.json')).st_mtime
+                    entries.append((mtime, _directory_size(path), path))
+            except OSError:
+                continue
+
+        # 오래 쓰지 않은 항목부터 용량 한도 안으로 들어올 때까지 삭제 (방금 쓴 가장 최근 항목은 남긴다)
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries)[:-1]:
+            if total_bytes <= max_bytes:
+                break
+            if os.path.isdir(path):
+                with _date_sync_lock:
+                    shutil.rmtree(path, ignore_errors=True)
+            else:
+                for stale_path in (path, path + '.json'):
+                    try:
+                        os.remove(stale_path)
+                    except OSError:
+                        pass
+            total_bytes -= size
+
+def get_dataframe_from_bigquery(dataset_id, table_id, columns=None, row_filter=None, disk_cache=True):
+
+    if not disk_cache or (dataset_id, table_id) in DATA_CACHE_EXCLUDED_TABLES:
+        # 예전에 디스크에 남은 사본이 있으면 지운다
+        cache_path = _data_cache_path(dataset_id, table_id, columns, row_filter)
+        for stale_path in (cache_path, cache_path + '.json'):
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+
+        arrow_table = read_arrow_table_from_bigquery(dataset_id, table_id, columns, row_filter)
+
+        return arrow_table.to_pandas(split_blocks=True, self_destruct=True)
+
+    # 테이블이 바뀌지 않았으면 로컬 디스크 캐시에서 읽는다
+    version = get_table_version(dataset_id, table_id)
+    cache_path = _data_cache_path(dataset_id, table_id, columns, row_filter)
+
+    arrow_table = read_data_cache(cache_path, version)
+    if arrow_table is None:
+        # 필요한 열만 Arrow로 읽어온다 (columns가 없으면 전체 열)
+        arrow_table = read_arrow_table_from_bigquery(dataset_id, table_id, columns, row_filter)
+        write_data_cache(cache_path, arrow_table, version)
+
+    # Arrow 버퍼에서 바로 DataFrame 생성 (변환이 끝난 버퍼는 즉시 해제)
+    df = arrow_table.to_pandas(split_blocks=True, self_destruct=True)
 
     return df
 
 
-def get_dataframe_from_bigquery_by_date(dataset_id, table_id, start_date, end_date):
+# collection_Date 기준으로 로컬 사본을 증분 동기화하는 테이블과 보관할 열
+DATE_SYNC_COLUMNS = {
+    ('DATA_WAREHOUSE', 'budget_data'): [
+        'collection_Date', '지역명', '자치단체명', '세부사업명',
+        '예산현액', '국비', '시도비', '시군구비', '기타', '지출액', '편성액'
+    ],
+}
+
+_date_sync_lock = threading.Lock()
+
+def _date_sync_dir(dataset_id, table_id):
+    return os.path.join(DATA_CACHE_DIR, f"{dataset_id}.{table_id}.by_date")
+
+def get_date_partition_stamp(dataset_id, table_id, partition_date):
+    # 날짜 파일은 다시 받을 때 통째로 교체되므로 수정 시각으로 내용이 바뀌었는지 구분
+    try:
+        return os.stat(os.path.join(_date_sync_dir(dataset_id, table_id), f"{partition_date}.arrow")).st_mtime_ns
+    except OSError:
+        return None
+
+def _read_date_sync_meta(sync_dir):
+    try:
+        with open(os.path.join(sync_dir, 'sync.json'), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def _write_date_partitions(sync_dir, arrow_table, partition_rows):
+
+    date_values = pc.cast(arrow_table['collection_Date'], pa.string())
+
+    # 날짜별로 나눠 파일 하나씩 저장 (같은 날짜 파일은 통째로 교체)
+    # 수집일이 없는 행은 어느 날짜 조회에도 나오지 않으므로 저장하지 않고 행 수만 돌려준다
+    for date_value in pc.unique(date_values).to_pylist():
+        if date_value is None:
+            continue
+        partition = arrow_table.filter(pc.equal(date_values, date_value))
+        partition_date = date_value[:10]
+
+        partition_path = os.path.join(sync_dir, f"{partition_date}.arrow")
+        temp_path = f"{partition_path}.{uuid.uuid4().hex}.tmp"
+        with pa.OSFile(temp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, partition.schema) as writer:
+                writer.write_table(partition)
+        os.replace(temp_path, partition_path)
+
+        partition_rows[partition_date] = partition.num_rows
+
+    return date_values.null_count
+
+def _sync_table_by_date(dataset_id, table_id):
+
+    # _date_sync_lock을 잡은 상태에서만 호출 (동기화 여부도 함께 돌려준다)
+    columns = DATE_SYNC_COLUMNS[(dataset_id, table_id)]
+    sync_dir = _date_sync_dir(dataset_id, table_id)
+
+    meta = _read_date_sync_meta(sync_dir)
+    version = get_table_version(dataset_id, table_id)
+
+    if meta.get('version') == version and meta.get('columns') == columns:
+        # LRU 정리를 위해 사용 시각 갱신
+        os.utime(os.path.join(sync_dir, 'sync.json'))
+        return meta, False
+
+    # 보관 열이 바뀌었으면 처음부터 다시 받는다
+    if meta.get('columns') != columns:
+        meta = {}
+    partition_rows = meta.get('partition_rows', {})
+    high_water_mark = meta.get('high_water_mark')
+
+    os.makedirs(sync_dir, exist_ok=True)
+
+    # 마지막으로 받은 날짜(당일 추가분 포함)부터 이후 날짜만 가져온다 (수집일이 없는 행은 행 수 확인용으로 매번 같이 받는다)
+    row_filter = f"collection_Date >= '{high_water_mark}' OR collection_Date IS NULL" if high_water_mark else None
+    delta = read_arrow_table_from_bigquery(dataset_id, table_id, columns, row_filter)
+    null_rows = _write_date_partitions(sync_dir, delta, partition_rows)
+
+    # 과거 날짜가 수정되어 전체 행 수가 맞지 않으면 전체를 다시 받는다
+    remote_rows = int(version.split('|')[-1])
+    if high_water_mark and sum(partition_rows.values()) + null_rows != remote_rows:
+        print(f"Local copy of {table_id} is out of sync, reloading all dates.")
+        for name in os.listdir(sync_dir):
+            if name.endswith('.arrow'):
+                os.remove(os.path.join(sync_dir, name))
+        partition_rows = {}
+        null_rows = _write_date_partitions(sync_dir, read_arrow_table_from_bigquery(dataset_id, table_id, columns), partition_rows)
+
+    meta = {
+        'version': version,
+        'columns': columns,
+        'high_water_mark': max(partition_rows) if partition_rows else None,
+        'partition_rows': partition_rows,
+        'null_rows': null_rows,
+    }
+    with open(os.path.join(sync_dir, 'sync.json'), 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+
+    print(f"Synced {delta.num_rows} rows of {table_id} since {high_water_mark}.")
+
+    return meta, True
+
+def sync_table_by_date(dataset_id, table_id):
+
+    with _date_sync_lock:
+        meta, synced = _sync_table_by_date(dataset_id, table_id)
 
-    client = bigquery.Client(credentials=credentials, project=credentials.project_id)
+    # 날짜별 사본도 디스크 캐시 용량 한도에 포함 (정리는 잠금을 놓은 뒤에)
+    if synced:
+        evict_data_cache()
+
+    return meta
+
+def get_dataframe_from_bigquery_by_date(dataset_id, table_id, start_date, end_date, columns=None):
 
     start_date = pd.to_datetime(start_date, format='%Y%m%d').date().strftime('%Y-%m-%d')
     end_date = pd.to_datetime(end_date, format='%Y%m%d').date().strftime('%Y-%m-%d')
 
-    query = f"""
-    SELECT *
-    FROM `{dataset_id}.{table_id}`
-    WHERE collection_Date BETWEEN '{start_date}' AND '{end_date}'
-    """
+    if (dataset_id, table_id) not in DATE_SYNC_COLUMNS:
+        row_filter = f"collection_Date BETWEEN '{start_date}' AND '{end_date}'"
+
+        return get_dataframe_from_bigquery(dataset_id, table_id, columns, row_filter)
+
+    # 증분 동기화된 로컬 사본에서 날짜 범위만 메모리 매핑으로 읽는다
+    # 파일을 여는 동안 잠금을 잡아 캐시 정리가 폴더를 지우지 못하게 한다 (매핑된 뒤에는 지워져도 읽을 수 있다)
+    sync_dir = _date_sync_dir(dataset_id, table_id)
+    with _date_sync_lock:
+        meta, synced = _sync_table_by_date(dataset_id, table_id)
+        columns = columns or meta['columns']
+
+        partitions = []
+        for partition_date in sorted(meta['partition_rows']):
+            if start_date <= partition_date <= end_date:
+                with pa.memory_map(os.path.join(sync_dir, f"{partition_date}.arrow"), 'r') as source:
+                    partitions.append(pa.ipc.open_file(source).read_all().select(columns))
+
+    if synced:
+        evict_data_cache()
+
+    if not partitions:
+        return pd.DataFrame(columns=columns)
 
-    # 쿼리 실행
-    df = client.query(query).to_dataframe()
+    df = pa.concat_tables(partitions).to_pandas(split_blocks=True, self_destruct=True)
 
     return df
 
-def get_geodataframe_from_bigquery(dataset_id, table_id):
+# 평면 좌표로 저장된 도형 테이블의 기본 좌표계
+GEOMETRY_DEFAULT_CRS = "EPSG:5179"
 
-    # 빅쿼리 클라이언트 객체 생성
-    client = bigquery.Client(credentials=credentials)
+def get_geodataframe_from_bigquery(dataset_id, table_id, geometry_column='geometry', columns=None, as_wkb=True):
 
-    # 쿼리 작성
-    query = f"SELECT * FROM `{dataset_id}.{table_id}`"
+    client = get_bigquery_client()
+    table = client.get_table(f"{client.project}.{dataset_id}.{table_id}")
+    geometry_type = next(field.field_type for field in table.schema if field.name == geometry_column)
 
-    # 쿼리 실행
-    df = client.query(query).to_dataframe()
+    # GEOGRAPHY 열은 서버에서 WKB(또는 WKT)로 바꿔 받고, BYTES/STRING 열은 그대로 받는다
+    if geometry_type == 'GEOGRAPHY':
+        geometry_expression = f"ST_ASBINARY(`{geometry_column}`)" if as_wkb else f"ST_ASTEXT(`{geometry_column}`)"
+        geometry_format = 'wkb' if as_wkb else 'wkt'
+        crs = "EPSG:4326"
+    else:
+        geometry_expression = f"`{geometry_column}`"
+        geometry_format = 'wkb' if geometry_type == 'BYTES' else 'wkt'
+        crs = GEOMETRY_DEFAULT_CRS
+
+    columns = [column for column in (columns or [field.name for field in table.schema]) if column != geometry_column]
+    select_columns = ', '.join([f"`{column}`" for column in columns] + [f"{geometry_expression} AS `{geometry_column}`"])
+    query = f"SELECT {select_columns} FROM `{dataset_id}.{table_id}`"
 
-    # 'geometry' 열의 문자열을 다각형 객체로 변환
-    df['geometry'] = df['geometry'].apply(wkt.loads)
+    df = client.query(query).to_arrow().to_pandas(split_blocks=True, self_destruct=True)
 
-    # GeoDataFrame으로 변환
-    gdf = gpd.GeoDataFrame(df, geometry='geometry')
-    gdf.crs = "EPSG:5179"
+    # shapely 2.0 배열 함수로 한 번에 디코딩
+    encoded = df.pop(geometry_column).to_numpy()
+    geometries = shapely.from_wkb(encoded) if geometry_format == 'wkb' else shapely.from_wkt(encoded)
+
+    gdf = gpd.GeoDataFrame(df, geometry=geometries, crs=crs)
 
     return gdf
 
+class GeometryIndex:
 
-def log_user_action(username, action, dataset_id, table_id):
+    def __init__(self, gdf):
+        self.gdf = gdf
+        self.crs = gdf.crs
+        self.geometries = np.asarray(gdf.geometry.values)
+        self.tree = shapely.STRtree(self.geometries)
+
+    def locate_points(self, x, y, crs=None):
+
+        # 다른 좌표계의 점(위경도 등)은 도형 좌표계로 변환한 뒤 한 번에 조회
+        points = gpd.GeoSeries(gpd.points_from_xy(x, y), crs=crs or self.crs)
+        if crs is not None and self.crs is not None and points.crs != self.crs:
+            points = points.to_crs(self.crs)
+
+        point_positions, geometry_positions = self.tree.query(np.asarray(points.values), predicate='within')
+
+        # 점마다 처음 만난 도형의 위치 (어느 도형에도 속하지 않으면 -1)
+        located = np.full(len(points), -1, dtype=np.int64)
+        located[point_positions[::-1]] = geometry_positions[::-1]
+
+        return located
+
+    def query_bbox(self, min_x, min_y, max_x, max_y):
+        positions = self.tree.query(shapely.box(min_x, min_y, max_x, max_y), predicate='intersects')
+
+        return self.gdf.iloc[np.sort(positions)]
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _get_geometry_index(dataset_id, table_id, geometry_column, version):
+    return GeometryIndex(get_geodataframe_from_bigquery(dataset_id, table_id, geometry_column))
+
+def get_geometry_index(dataset_id, table_id, geometry_column='geometry'):
+    # 도형 테이블이 바뀌지 않았으면 디코딩된 도형과 STRtree를 그대로 재사용
+    return _get_geometry_index(dataset_id, table_id, geometry_column, get_table_version(dataset_id, table_id))
+
+def join_points_to_polygons(df, geometry_index, columns, x_column='경도', y_column='위도', crs="EPSG:4326"):
+
+    # 좌표 열 전체를 한 번의 공간 조인으로 행정구역 도형에 매칭
+    located = geometry_index.locate_points(df[x_column].to_numpy(dtype='float64'), df[y_column].to_numpy(dtype='float64'), crs)
+
+    # 매칭되지 않은 점(-1)은 결측으로 남는다
+    joined = {
+        column: geometry_index.gdf[column].reset_index(drop=True).reindex(located).set_axis(df.index)
+        for column in columns
+    }
+
+    return df.assign(**joined)
+
+# 백업 스냅샷 보관 정책
+SNAPSHOT_RETENTION_DAYS = 30
+SNAPSHOT_KEEP_COUNT = 30
+
+_snapshot_versions = {}
+_snapshot_lock = threading.Lock()
+
+def get_table_content_hash(dataset_id, table_id):
+
+    client = get_bigquery_client()
+
+    # 행 단위 지문을 서버에서 XOR로 합쳐 테이블 내용 해시를 계산 (데이터 다운로드 없음)
+    query = f"""
+    SELECT FORMAT('%x', IFNULL(BIT_XOR(FARM_FINGERPRINT(TO_JSON_STRING(t))), 0)) AS content_hash
+    FROM `{dataset_id}.{table_id}` AS t
+    """
+
+    rows = list(client.query(query).result())
 
-    client = bigquery.Client(credentials=credentials)
+    # 라벨 값에는 '-'를 쓸 수 없으므로 음수 부호를 'n'으로 표기
+    return rows[0]['content_hash'].replace('-', 'n')
 
-    table_ref = f"{client.project}.{dataset_id}.{table_id}"
+def backup_table_snapshot(dataset_id, table_id, backup_dataset_id,
+                          retention_days=SNAPSHOT_RETENTION_DAYS, keep_count=SNAPSHOT_KEEP_COUNT):
+
+    client = get_bigquery_client()
+
+    source_ref = f"{client.project}.{dataset_id}.{table_id}"
+    source_table = client.get_table(source_ref)
+
+    with _snapshot_lock:
+        # 이미 백업한 버전이면 아무 것도 하지 않음
+        if _snapshot_versions.get(source_ref) == source_table.modified:
+            return None
+
+        content_hash = get_table_content_hash(dataset_id, table_id)
+
+        backups = [
+            table for table in client.list_tables(backup_dataset_id)
+            if table.table_id.startswith(f'{table_id}_')
+        ]
+
+        if any((table.labels or {}).get('content_hash') == content_hash for table in backups):
+            _snapshot_versions[source_ref] = source_table.modified
+            return None
+
+        # 서버 측 스냅샷 복사 (변경분만 저장되고 만료일이 지나면 자동 삭제)
+        kst = pytz.timezone('Asia/Seoul')
+        now = datetime.now(kst)
+        snapshot_id = f"{table_id}_{now.strftime('%Y%m%d_%H%M%S')}"
+        snapshot_ref = f"{client.project}.{backup_dataset_id}.{snapshot_id}"
+
+        job_config = bigquery.CopyJobConfig()
+        job_config.operation_type = bigquery.job.OperationType.SNAPSHOT
+        job_config.destination_expiration_time = (now + timedelta(days=retention_days)).isoformat()
+
+        client.copy_table(source_ref, snapshot_ref, job_config=job_config).result()
+
+        snapshot_table = client.get_table(snapshot_ref)
+        snapshot_table.labels = {'content_hash': content_hash}
+        client.update_table(snapshot_table, ['labels'])
+
+        # 보관 개수를 넘는 백업은 이 함수가 만든 스냅샷(content_hash 라벨)만 지운다
+        # (예전 방식의 백업 테이블은 사람이 정리하도록 그대로 둔다)
+        snapshots = sorted(
+            [table for table in backups if 'content_hash' in (table.labels or {})],
+            key=lambda table: table.table_id, reverse=True,
+        )
+        stale_snapshots = snapshots[max(keep_count - 1, 0):]
+
+        _snapshot_versions[source_ref] = source_table.modified
+
+    for table in stale_snapshots:
+        client.delete_table(table.reference, not_found_ok=True)
+
+    print(f"Snapshot {snapshot_id} of table {table_id} created successfully.")
+
+    return snapshot_id
+
+
+# 사용자 로그는 큐에 쌓아두고 백그라운드 스레드가 모아서 적재
+AUDIT_LOG_BATCH_SIZE = 50
+AUDIT_LOG_FLUSH_INTERVAL = 5  # 초
+AUDIT_LOG_MAX_RETRIES = 3
+AUDIT_LOG_SPILL_PATH = os.environ.get('AUDIT_LOG_SPILL_PATH', 'audit_log_spill.jsonl')
+
+_audit_log_queue = queue.Queue()
+_audit_log_worker = None
+_audit_log_lock = threading.Lock()
+
+def log_user_action(username, action, dataset_id, table_id):
+
+    # 같은 세션에서 재실행마다 반복되는 같은 화면 조회 기록은 한 번만 남긴다
+    # (세션 상태에 두므로 세션이 끝나면 함께 사라진다, 스크립트 밖 호출은 그대로 기록)
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        if action.startswith('viewed') and st.session_state.get('_last_view_action') == (username, action):
+            return
+        st.session_state['_last_view_action'] = (username, action)
 
     # 현재 시각을 한국 시간으로 설정
     kst = pytz.timezone('Asia/Seoul')
     timestamp_now = datetime.now(kst).strftime('%Y-%m-%d %H:%M:%S')
 
-    rows_to_insert = [
-        {
-            "username": username,
-            "timestamp": timestamp_now,  # 문자열로 변환된 시각
-            "action": action
-        }
-    ]
-
-    errors = client.insert_rows_json(table_ref, rows_to_insert)
-    if errors == []:
-        print("New rows have been added.")
+    row = {
+        "username": username,
+        "timestamp": timestamp_now,  # 문자열로 변환된 시각
+        "action": action
+    }
+
+    _audit_log_queue.put((f"{dataset_id}.{table_id}", row))
+    _start_audit_log_worker()
+
+def _start_audit_log_worker():
+    global _audit_log_worker
+
+    if _audit_log_worker is not None and _audit_log_worker.is_alive():
+        return
+
+    with _audit_log_lock:
+        if _audit_log_worker is None or not _audit_log_worker.is_alive():
+            _audit_log_worker = threading.Thread(target=_audit_log_worker_loop, name='audit-log-worker', daemon=True)
+            _audit_log_worker.start()
+
+def _audit_log_worker_loop():
+    while True:
+        batch = [_audit_log_queue.get()]
+
+        # 배치 크기가 찰 때까지 또는 주기가 지날 때까지 모은다
+        deadline = time.monotonic() + AUDIT_LOG_FLUSH_INTERVAL
+        while len(batch) < AUDIT_LOG_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(_audit_log_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        _flush_audit_log_batch(batch)
+
+def flush_audit_log():
+    batch = []
+    while True:
+        try:
+            batch.append(_audit_log_queue.get_nowait())
+        except queue.Empty:
+            break
+
+    if batch:
+        _flush_audit_log_batch(batch)
+
+atexit.register(flush_audit_log)
+
+def _flush_audit_log_batch(batch):
+
+    # 이전에 적재하지 못하고 파일에 남겨둔 로그가 있으면 함께 보낸다
+    with _audit_log_lock:
+        if os.path.exists(AUDIT_LOG_SPILL_PATH):
+            with open(AUDIT_LOG_SPILL_PATH, 'r', encoding='utf-8') as file:
+                spilled = [json.loads(line) for line in file if line.strip()]
+            os.remove(AUDIT_LOG_SPILL_PATH)
+            batch = [(item['table'], item['row']) for item in spilled] + batch
+
+    rows_by_table = {}
+    for table, row in batch:
+        rows_by_table.setdefault(table, []).append(row)
+
+    for table, rows in rows_by_table.items():
+        if not _insert_audit_log_rows(table, rows):
+            _spill_audit_log_rows(table, rows)
+
+def _insert_audit_log_rows(table, rows):
+
+    for attempt in range(AUDIT_LOG_MAX_RETRIES):
+        try:
+            client = get_bigquery_client()
+            errors = client.insert_rows_json(f"{client.project}.{table}", rows)
+            if errors == []:
+                print(f"{len(rows)} new rows have been added.")
+                return True
+            print("Encountered errors while inserting rows: {}".format(errors))
+        except Exception as e:
+            print(f"Failed to insert log rows: {e}")
+
+        # 재시도 간격은 1, 2초로 늘린다 (마지막 실패 뒤에는 기다리지 않고 바로 파일로 넘긴다)
+        if attempt < AUDIT_LOG_MAX_RETRIES - 1:
+            time.sleep(2 ** attempt)
+
+    return False
+
+def _spill_audit_log_rows(table, rows):
+
+    with _audit_log_lock:
+        with open(AUDIT_LOG_SPILL_PATH, 'a', encoding='utf-8') as file:
+            for row in rows:
+                file.write(json.dumps({'table': table, 'row': row}, ensure_ascii=False) + '\n')
+
+    print(f"{len(rows)} log rows spilled to {AUDIT_LOG_SPILL_PATH}.")
+
+# 테이블별 열 타입 선언 (money, area, number, date, datetime, category, text)
+BUDGET_SCHEMA = {
+    '지역명': 'category', '자치단체명': 'category', '세부사업명': 'text',
+    '예산현액': 'money', '국비': 'money', '시도비': 'money', '시군구비': 'money',
+    '기타': 'money', '지출액': 'money', '편성액': 'money',
+}
+
+EDU_BUDGET_SCHEMA = {
+    '도광역시': 'category', '시군구': 'category', '구분': 'category', '과업명': 'text',
+    '금액': 'money', '면적': 'area', '예산집행': 'text',
+}
+
+BID_SCHEMA = {
+    '입력일': 'date', '참가마감': 'date', '투찰마감': 'date', '개찰일': 'date',
+    '추정가격': 'money', '기초금액': 'money',
+    '공고명': 'text', '발주기관': 'text', '업종': 'category', '지역': 'category', '분류': 'category',
+}
+
+TABLE_SCHEMAS = {
+    'budget_data': BUDGET_SCHEMA,
+    'new_budget_data': BUDGET_SCHEMA,
+    'latest_budget_data': BUDGET_SCHEMA,
+    'edu_budget_data': EDU_BUDGET_SCHEMA,
+    'bid_con_data': BID_SCHEMA,
+    'bid_ser_data': BID_SCHEMA,
+    'bid_pur_data': BID_SCHEMA,
+    # 편집 화면에서 쓰는 테이블은 값 제약이 생기지 않도록 숫자 열만 변환
+    'list_up_budget_data': {column: 'money' for column in ['예산현액', '국비', '시도비', '시군구비', '기타', '지출액', '편성액']},
+    'list_up_edu_budget_data': {'금액': 'money', '면적': 'area'},
+    'g2b_data': {
+        '납품요구접수일자': 'datetime', '단가': 'number', '수량': 'number', '금액': 'number',
+        '계약구분': 'category', '수요기관구분': 'category', '수요기관지역명': 'category',
+    },
+}
+
+def _parse_number(series):
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
     else:
-        print("Encountered errors while inserting rows: {}".format(errors))
+        # Arrow 문자열 커널로 천 단위 구분기호를 한 번에 제거한 뒤 숫자로 변환
+        text = series.astype('string[pyarrow]').str.replace(',', '', regex=False)
+        values = pd.to_numeric(text, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+    return pd.Series(values, index=series.index, name=series.name)
+
+def _parse_money(series):
+    values = _parse_number(series)
+
+    # 금액이 모두 정수이면 nullable 정수형으로 저장
+    valid = values.dropna()
+    if (valid % 1 == 0).all() and (valid.abs() < 2 ** 53).all():
+        return values.astype('Int64')
+
+    return values
+
+def _parse_date(series):
+    timestamps = pd.to_datetime(series, errors='coerce').dt.normalize()
+
+    return timestamps.astype(pd.ArrowDtype(pa.date32()))
+
+COLUMN_PARSERS = {
+    'money': _parse_money,
+    'area': _parse_number,
+    'number': _parse_number,
+    'date': _parse_date,
+    'datetime': lambda series: pd.to_datetime(series, errors='coerce'),
+    'category': lambda series: series.astype('category'),
+    'text': lambda series: series,
+}
+
+def compact_dataframe(df, category_ratio=0.5):
+
+    memory_before = int(df.memory_usage(deep=True).sum())
+
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            df[column] = series.cat.remove_unused_categories()
+        elif series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+            # 반복되는 값(지역명, 업종 등)은 사전 인코딩, 나머지 문자열은 Arrow 버퍼에 보관
+            if series.nunique(dropna=True) <= len(series) * category_ratio:
+                df[column] = series.astype('category')
+            else:
+                df[column] = series.astype('string[pyarrow]')
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast='integer')
 
-@st.cache_data
+    memory_after = int(df.memory_usage(deep=True).sum())
+    df.attrs['memory_before'] = memory_before
+    df.attrs['memory_after'] = memory_after
+
+    print(f"Compacted {len(df)} rows: {memory_before / 1024 ** 2:.1f}MB -> {memory_after / 1024 ** 2:.1f}MB")
+
+    return df
+
+def coerce_dataframe(df, table_id):
+
+    # 선언된 타입에 따라 열마다 한 번씩만 변환
+    for column, column_type in TABLE_SCHEMAS.get(table_id, {}).items():
+        if column in df.columns:
+            df[column] = COLUMN_PARSERS[column_type](df[column])
+
+    return df
+
+@cache_by_table_version(('SERVICE_DATA', 'users'))
 def load_users_data():
-    users = get_dataframe_from_bigquery('SERVICE_DATA', 'users').sort_values(by='employeeNumber').reset_index(drop=True)
+    users = get_dataframe_from_bigquery('SERVICE_DATA', 'users', ['employeeNumber', 'employeeName', 'jobTitle', 'password'], disk_cache=False).sort_values(by='employeeNumber').reset_index(drop=True)
     users = users[['employeeName', 'jobTitle', 'password']]
 
     return users
 
-@st.cache_data(ttl=300)
+@cache_by_table_version(('DATA_MARTS', 'list_up_budget_data'), ('DATA_MARTS', 'list_up_edu_budget_data'), shared=True)
 def load_list_up_data():
-    list_up_budget_data = get_dataframe_from_bigquery('DATA_MARTS', 'list_up_budget_data')
-    list_up_edu_budget_data = get_dataframe_from_bigquery('DATA_MARTS', 'list_up_edu_budget_data')
+    tables = _load_tables_or_raise({
+        table_id: functools.partial(get_dataframe_from_bigquery, 'DATA_MARTS', table_id)
+        for table_id in ['list_up_budget_data', 'list_up_edu_budget_data']
+    })
+    list_up_budget_data = coerce_dataframe(tables['list_up_budget_data'], 'list_up_budget_data')
+    list_up_edu_budget_data = coerce_dataframe(tables['list_up_edu_budget_data'], 'list_up_edu_budget_data')
 
     list_up_budget_data = list_up_budget_data.sort_values(by=['지역명', '자치단체명'])
     list_up_edu_budget_data = list_up_edu_budget_data.sort_values(by=['도광역시', '시군구'])
 
     return list_up_budget_data, list_up_edu_budget_data
 
-@st.cache_data(ttl=3600)
+@cache_by_table_version(('DATA_WAREHOUSE', 'budget_data'), daily=True, shared=True)
 def load_budget_data():
     today = datetime.now().date()
 
-    budget_df = get_dataframe_from_bigquery_by_date('DATA_WAREHOUSE', 'budget_data', today, today)
-
-    numeric_columns = ['예산현액', '국비', '시도비', '시군구비', '기타', '지출액', '편성액']
-
-    for column in numeric_columns:
-        if column in budget_df.columns:
-            budget_df[column] = budget_df[column].str.replace(',', '')
-            budget_df[column] = pd.to_numeric(budget_df[column], errors='coerce')
-
     columns_to_view = [
         '지역명', '자치단체명', '세부사업명', '예산현액', '국비', '시도비', '시군구비', '기타', '지출액', '편성액'
     ]
 
+    budget_df = get_dataframe_from_bigquery_by_date('DATA_WAREHOUSE', 'budget_data', today, today, columns_to_view)
+
+    budget_df = coerce_dataframe(budget_df, 'budget_data')
+
     budget_df = budget_df[columns_to_view]
     budget_df = budget_df.sort_values(by='자치단체명')
 
-    return budget_df
+    return compact_dataframe(budget_df)
 
-def load_latest_budget_data():
+# 서로 독립적인 테이블은 제한된 스레드 풀에서 동시에 불러온다
+LOADER_MAX_WORKERS = 4
+LOADER_TIMEOUT = 120  # 초
+
+def load_concurrently(tasks, timeout=LOADER_TIMEOUT, timeouts=None):
+
+    timeouts = timeouts or {}
+    ctx = get_script_run_ctx(suppress_warning=True)
+
+    def run(task):
+        # 작업 스레드에서도 현재 세션의 스트림릿 캐시/컨텍스트를 쓰도록 연결
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return task()
+
+    # 호출마다 풀을 따로 두어 로더 안에서 다시 동시 로딩을 해도 서로 기다리며 멈추지 않게 한다
+    executor = ThreadPoolExecutor(max_workers=min(len(tasks), LOADER_MAX_WORKERS) or 1, thread_name_prefix='table-loader')
+    started = time.monotonic()
+    futures = {name: executor.submit(run, task) for name, task in tasks.items()}
+
+    results, errors = {}, {}
+    for name, future in futures.items():
+        remaining = started + timeouts.get(name, timeout) - time.monotonic()
+        try:
+            results[name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            errors[name] = TimeoutError(f"Loading {name} timed out after {timeouts.get(name, timeout)} seconds.")
+        except Exception as e:
+            errors[name] = e
+
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for name, error in errors.items():
+        print(f"Failed to load {name}: {error}")
+
+    return results, errors
+
+def _load_tables_or_raise(tasks):
+    results, errors = load_concurrently(tasks)
+    if errors:
+        raise next(iter(errors.values()))
+
+    return results
+
+# 예산 항목 비교 기준 열과 금액 열
+BUDGET_KEY_COLUMNS = ['지역명', '자치단체명', '세부사업명']
+BUDGET_VALUE_COLUMNS = ['예산현액', '국비', '시도비', '시군구비', '기타', '지출액', '편성액']
+
+def get_synced_dates(dataset_id, table_id):
+    meta = sync_table_by_date(dataset_id, table_id)
+
+    return sorted(meta['partition_rows'])
+
+@cache_by_table_version(('DATA_WAREHOUSE', 'budget_data'), max_entries=16, shared=True)
+def load_budget_snapshot(collection_date):
+    # 동기화된 날짜는 'YYYY-MM-DD' 문자열이므로 날짜 객체로 넘긴다 (by_date 조회는 문자열을 YYYYMMDD로 해석)
+    collection_date = pd.to_datetime(collection_date).date()
+    snapshot_df = get_dataframe_from_bigquery_by_date('DATA_WAREHOUSE', 'budget_data', collection_date, collection_date, BUDGET_KEY_COLUMNS + BUDGET_VALUE_COLUMNS)
+    snapshot_df = coerce_dataframe(snapshot_df, 'budget_data')
+
+    # 같은 키가 여러 번 나오면 등장 순서로 구분
+    snapshot_df = snapshot_df.sort_values(by=BUDGET_KEY_COLUMNS + BUDGET_VALUE_COLUMNS).reset_index(drop=True)
+    occurrence = snapshot_df.groupby(BUDGET_KEY_COLUMNS, observed=True, dropna=False).cumcount()
+
+    # 키와 금액을 각각 해시해 두고 비교는 해시값으로만 한다
+    snapshot_df['item_hash'] = pd.util.hash_pandas_object(snapshot_df[BUDGET_KEY_COLUMNS].astype(str).assign(occurrence=occurrence), index=False).to_numpy()
+    snapshot_df['value_hash'] = pd.util.hash_pandas_object(snapshot_df[BUDGET_VALUE_COLUMNS].astype('float64'), index=False).to_numpy()
+
+    return compact_dataframe(snapshot_df)
+
+def diff_budget_snapshots(start_date, end_date):
+
+    # 수집되지 않은 날짜는 그 이전 가장 가까운 수집일로 맞춘다
+    synced_dates = get_synced_dates('DATA_WAREHOUSE', 'budget_data')
+    start_date, end_date = [
+        max([date for date in synced_dates if date <= pd.to_datetime(value).strftime('%Y-%m-%d')], default=None)
+        for value in (start_date, end_date)
+    ]
 
-    new_budget_data = get_dataframe_from_bigquery('DATA_MARTS', 'new_budget_data')
-    latest_budget_data = get_dataframe_from_bigquery('DATA_MARTS', 'latest_budget_data')
+    if start_date is None or end_date is None:
+        empty_df = pd.DataFrame(columns=BUDGET_KEY_COLUMNS + BUDGET_VALUE_COLUMNS)
+        return {'start_date': start_date, 'end_date': end_date, 'added': empty_df, 'removed': empty_df, 'changed': empty_df}
 
-    numeric_columns = ['예산현액', '국비', '시도비', '시군구비', '기타', '지출액', '편성액']
+    # 같은 수집일 쌍은 테이블이 바뀌기 전까지 비교 결과를 재사용
+    return _diff_budget_snapshots(start_date, end_date)
 
-    for column in numeric_columns:
-        if column in new_budget_data.columns:
-            new_budget_data[column] = new_budget_data[column].str.replace(',', '')
-            new_budget_data[column] = pd.to_numeric(new_budget_data[column], errors='coerce')
+@cache_by_table_version(('DATA_WAREHOUSE', 'budget_data'), max_entries=16)
+def _diff_budget_snapshots(start_date, end_date):
 
-    for column in numeric_columns:
-        if column in latest_budget_data.columns:
-            latest_budget_data[column] = latest_budget_data[column].str.replace(',', '')
-            latest_budget_data[column] = pd.to_numeric(latest_budget_data[column], errors='coerce')
+    before = load_budget_snapshot(start_date)
+    after = load_budget_snapshot(end_date)
+
+    added = after[~after['item_hash'].isin(before['item_hash'])]
+    removed = before[~before['item_hash'].isin(after['item_hash'])]
+
+    # 양쪽에 모두 있는 항목 중 금액 해시가 다른 항목만 비교
+    common = after[['item_hash', 'value_hash']].merge(before[['item_hash', 'value_hash']], on='item_hash', suffixes=('', '_before'))
+    changed_hashes = common.loc[common['value_hash'] != common['value_hash_before'], 'item_hash']
+
+    changed_after = after[after['item_hash'].isin(changed_hashes)].set_index('item_hash')
+    changed_before = before[before['item_hash'].isin(changed_hashes)].set_index('item_hash').reindex(changed_after.index)
+
+    changed = changed_after[BUDGET_KEY_COLUMNS + BUDGET_VALUE_COLUMNS].copy()
+    for column in BUDGET_VALUE_COLUMNS:
+        changed[f'{column}_증감'] = changed_after[column].astype('float64') - changed_before[column].astype('float64')
+
+    view_columns = BUDGET_KEY_COLUMNS + BUDGET_VALUE_COLUMNS
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'added': added[view_columns].sort_values(by='자치단체명'),
+        'removed': removed[view_columns].sort_values(by='자치단체명'),
+        'changed': changed.reset_index(drop=True).sort_values(by='자치단체명'),
+    }
+
+@cache_by_table_version(('DATA_MARTS', 'new_budget_data'), ('DATA_MARTS', 'latest_budget_data'), shared=True)
+def load_latest_budget_data():
 
     columns_to_view = [
         '지역명', '자치단체명', '세부사업명', '예산현액', '국비', '시도비', '시군구비', '기타', '지출액', '편성액'
     ]
 
+    tables = _load_tables_or_raise({
+        table_id: functools.partial(get_dataframe_from_bigquery, 'DATA_MARTS', table_id, columns_to_view)
+        for table_id in ['new_budget_data', 'latest_budget_data']
+    })
+    new_budget_data = tables['new_budget_data']
+    latest_budget_data = tables['latest_budget_data']
+
+    new_budget_data = coerce_dataframe(new_budget_data, 'new_budget_data')
+    latest_budget_data = coerce_dataframe(latest_budget_data, 'latest_budget_data')
+
     new_budget_data = new_budget_data[columns_to_view]
     new_budget_data = new_budget_data.sort_values(by='자치단체명')
 
     latest_budget_data = latest_budget_data[columns_to_view]
     latest_budget_data = latest_budget_data.sort_values(by='자치단체명')
 
-    return new_budget_data, latest_budget_data
+    return compact_dataframe(new_budget_data), compact_dataframe(latest_budget_data)
 
-@st.cache_data(ttl=3600)
+@cache_by_table_version(('DATA_WAREHOUSE', 'edu_budget_data'), shared=True)
 def load_edu_budget_data():
-    edu_budget_df = get_dataframe_from_bigquery('DATA_WAREHOUSE', 'edu_budget_data')
-
-    numeric_columns = ['금액', '면적']
-
-    for column in numeric_columns:
-        if column in edu_budget_df.columns:
-            edu_budget_df[column] = edu_budget_df[column].str.replace(',', '')
-            edu_budget_df[column] = pd.to_numeric(edu_budget_df[column], errors='coerce')
-
     columns_to_view = [
         '도광역시', '시군구', '구분', '과업명', '금액', '면적', '예산집행'
     ]
 
+    edu_budget_df = get_dataframe_from_bigquery('DATA_WAREHOUSE', 'edu_budget_data', columns_to_view)
+
+    edu_budget_df = coerce_dataframe(edu_budget_df, 'edu_budget_data')
+
     edu_budget_df = edu_budget_df[columns_to_view]
     edu_budget_df = edu_budget_df.sort_values(by=['도광역시', '시군구'])
 
-    return edu_budget_df
+    return compact_dataframe(edu_budget_df)
+
+# 입찰 공고 마트별 구분과 보관 열
+BID_TABLES = {
+    '공사': 'bid_con_data',
+    '용역': 'bid_ser_data',
+    '구매': 'bid_pur_data',
+}
+BID_VIEW_COLUMNS = {
+    '공사': ['입력일', '공고명', '발주기관', '추정가격', '기초금액', '투찰마감', '개찰일', '업종', '지역', '분류'],
+    '용역': ['입력일', '공고명', '발주기관', '추정가격', '기초금액', '투찰마감', '개찰일', '업종', '지역', '분류'],
+    '구매': ['공고명', '기초금액', '업종', '참가마감', '투찰마감', '개찰일', '분류'],
+}
+# 정렬 색인을 유지하는 날짜 열
+BID_DATE_INDEX_COLUMNS = ['입력일', '투찰마감', '개찰일']
+
+def _date_ordinals(series):
+    # 날짜를 1970-01-01부터의 일수로 바꿔 범위 색인에 넣는다 (결측은 NaN)
+    days = pc.cast(pa.array(series, type=pa.date32(), from_pandas=True), pa.int32())
+
+    return days.to_numpy(zero_copy_only=False).astype('float64')
+
+def _date_ordinal(value):
+    return float((pd.Timestamp(value).normalize() - pd.Timestamp('1970-01-01')).days)
+
+class BidStore:
+
+    def __init__(self, df):
+        self.df = df
+        self.kinds = df['구분'].to_numpy()
+
+        # 날짜 열마다 정렬된 값/행 위치를 한 번만 만들어 두고 조회는 이진 탐색으로
+        self.indexes = {
+            column: search_utils.RangeIndex(_date_ordinals(df[column]))
+            for column in BID_DATE_INDEX_COLUMNS if column in df.columns
+        }
 
-@st.cache_data(ttl=3600)
-def load_info_con_data():
-    # 공사입찰/공사낙찰
+    def _select(self, positions, kinds=None):
+        if kinds is not None:
+            positions = positions[np.isin(self.kinds[positions], list(kinds))]
 
-    bir_con_df = get_dataframe_from_bigquery('DATA_MARTS', 'bid_con_data')
+        return self.df.iloc[positions]
 
-    bir_con_df['입력일'] = pd.to_datetime(bir_con_df['입력일']).dt.strftime('%Y-%m-%d')
-    bir_con_df['투찰마감'] = pd.to_datetime(bir_con_df['투찰마감']).dt.strftime('%Y-%m-%d')
-    bir_con_df['개찰일'] = pd.to_datetime(bir_con_df['개찰일']).dt.strftime('%Y-%m-%d')
+    def between(self, column, start_date, end_date, kinds=None, ascending=True):
+        positions = self.indexes[column].positions_between(_date_ordinal(start_date), _date_ordinal(end_date))
 
-    numeric_columns = ['추정가격', '기초금액']
+        return self._select(positions if ascending else positions[::-1], kinds)
 
-    for column in numeric_columns:
-        if column in bir_con_df.columns:
-            bir_con_df[column] = bir_con_df[column].str.replace(',', '')
-            bir_con_df[column] = pd.to_numeric(bir_con_df[column], errors='coerce')
+    def closing_within(self, days, kinds=None, today=None):
+        # 오늘부터 N일 안에 투찰이 마감되는 공고 (마감이 가까운 순)
+        today = pd.Timestamp(today or datetime.now(pytz.timezone('Asia/Seoul')).date())
 
-    info_con_df = bir_con_df.sort_values(by='입력일', ascending=False)
+        return self.between('투찰마감', today, today + pd.Timedelta(days=days), kinds)
 
-    view_columns = [
-        '입력일', '공고명', '발주기관', '추정가격', '기초금액', '투찰마감', '개찰일', '업종', '지역', '분류'
-    ]
+    def opened_since(self, since_date, kinds=None):
+        # since_date 이후 개찰된 공고 (최근 순)
+        return self.between('개찰일', since_date, pd.Timestamp.max.normalize(), kinds, ascending=False)
 
-    info_con_df = info_con_df[view_columns]
+    def view(self, kind, sort_column, ascending=False):
 
-    return info_con_df
+        # 정렬 색인 순서대로 한 구분만 골라낸다 (날짜가 없는 행은 기존 정렬처럼 맨 뒤)
+        index = self.indexes[sort_column]
+        positions = index.positions if ascending else index.positions[::-1]
 
-@st.cache_data(ttl=3600)
-def load_info_ser_data():
-    # 용역입찰/용역낙찰
+        return self._select(np.concatenate([positions, index.missing_positions]), [kind])[BID_VIEW_COLUMNS[kind]]
 
-    bir_ser_df = get_dataframe_from_bigquery('DATA_MARTS', 'bid_ser_data')
+@cache_by_table_version(*[('DATA_MARTS', table_id) for table_id in BID_TABLES.values()], shared=True)
+def load_bid_store():
 
-    bir_ser_df['입력일'] = pd.to_datetime(bir_ser_df['입력일']).dt.strftime('%Y-%m-%d')
-    bir_ser_df['투찰마감'] = pd.to_datetime(bir_ser_df['투찰마감']).dt.strftime('%Y-%m-%d')
-    bir_ser_df['개찰일'] = pd.to_datetime(bir_ser_df['개찰일']).dt.strftime('%Y-%m-%d')
+    # 세 마트를 동시에 불러 구분 열을 붙여 하나의 표로 합친다
+    tables = _load_tables_or_raise({
+        kind: functools.partial(get_dataframe_from_bigquery, 'DATA_MARTS', table_id, BID_VIEW_COLUMNS[kind])
+        for kind, table_id in BID_TABLES.items()
+    })
 
-    numeric_columns = ['추정가격', '기초금액']
+    bid_df = pd.concat([tables[kind].assign(구분=kind) for kind in BID_TABLES], ignore_index=True)
+    bid_df['구분'] = pd.Categorical(bid_df['구분'], categories=list(BID_TABLES))
 
-    for column in numeric_columns:
-        if column in bir_ser_df.columns:
-            bir_ser_df[column] = bir_ser_df[column].str.replace(',', '')
-            bir_ser_df[column] = pd.to_numeric(bir_ser_df[column], errors='coerce')
+    # 합친 뒤 열마다 한 번만 타입 변환 (한쪽 마트에만 있는 열은 결측)
+    bid_df = coerce_dataframe(bid_df, 'bid_con_data')
 
-    info_ser_df = bir_ser_df.sort_values(by='입력일', ascending=False)
+    return compact_dataframe(bid_df)
 
-    view_columns = [
-        '입력일', '공고명', '발주기관', '추정가격', '기초금액', '투찰마감', '개찰일', '업종', '지역', '분류'
-    ]
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _get_bid_store(_bid_df, token):
+    return BidStore(_bid_df)
 
-    info_ser_df = info_ser_df[view_columns]
+def get_bid_store():
+    bid_df = load_bid_store()
 
-    return info_ser_df
+    return _get_bid_store(bid_df, search_utils.frame_token(bid_df))
+
+def load_info_con_data():
+    # 공사입찰/공사낙찰
+    return get_bid_store().view('공사', '입력일')
+
+def load_info_ser_data():
+    # 용역입찰/용역낙찰
+    return get_bid_store().view('용역', '입력일')
 
-@st.cache_data(ttl=3600)
 def load_info_pur_data():
     # 구매입찰/구매낙찰
+    return get_bid_store().view('구매', '투찰마감')
+
+G2B_COLUMNS = [
+    '납품요구번호', '납품요구변경차수', '납품요구접수일자', '물품순번', '물품분류번호',
+    '품명', '세부물품분류번호', '세부품명', '물품식별번호', '품목', '단가', '단위',
+    '수량', '금액', '납품기한일자', '계약구분', '우수제품여부', '옵션구분', '수요기관코드',
+    '수요기관명', '수요기관구분', '수요기관지역명', '업체명', '최종납품요구여부',
+    '증감납품요구수량', '증감납품요구금액', '업체사업자등록번호', '납품요구건명',
+    '계약번호', '계약변경차수', '다수공급자계약여부', '공사용자재직접구매대상여부',
+    '최초납품요구접수일자', '납품요구수량', '납품요구금액', '중소기업자간경쟁제품여부',
+    '업체기업구분명', '납품요구지청명'
+]
+
+@st.cache_resource
+def load_region_table():
+    # region.json은 프로세스당 한 번만 읽어 지역 키로 색인된 표로 보관
+    with open('region.json', 'r', encoding='utf-8') as file:
+        regions = json.load(file)
 
-    bir_pur_df = get_dataframe_from_bigquery('DATA_MARTS', 'bid_pur_data')
+    region_table = pd.DataFrame.from_dict(regions, orient='index')[['lat', 'long']]
+    region_table.columns = ['위도', '경도']
 
-    bir_pur_df['참가마감'] = pd.to_datetime(bir_pur_df['참가마감']).dt.strftime('%Y-%m-%d')
-    bir_pur_df['투찰마감'] = pd.to_datetime(bir_pur_df['투찰마감']).dt.strftime('%Y-%m-%d')
-    bir_pur_df['개찰일'] = pd.to_datetime(bir_pur_df['개찰일']).dt.strftime('%Y-%m-%d')
+    return region_table
 
-    numeric_columns = ['기초금액']
+def geocode_regions(region_names):
 
-    for column in numeric_columns:
-        if column in bir_pur_df.columns:
-            bir_pur_df[column] = bir_pur_df[column].str.replace(',', '')
-            bir_pur_df[column] = pd.to_numeric(bir_pur_df[column], errors='coerce')
+    # 지역명은 종류가 적으므로 고유값만 분리/조회한 뒤 코드로 다시 펼친다
+    codes, uniques = pd.factorize(region_names)
+    uniques = pd.Series(uniques, dtype=object).astype(str)
+    uniques = uniques.str.replace('강원도', '강원특별자치도', regex=False).str.replace('전라북도', '전북특별자치도', regex=False)
 
-    info_pur_df = bir_pur_df.sort_values(by='투찰마감', ascending=False)
+    parts = uniques.str.split(' ', n=2, expand=True).reindex(columns=[0, 1])
+    sido = parts[0]
+    sigungu = parts[1]
 
-    view_columns = [
-        '공고명', '기초금액', '업종', '참가마감', '투찰마감', '개찰일', '분류'
-    ]
+    region_keys = sido + '/' + sigungu.fillna('')
 
-    info_pur_df = info_pur_df[view_columns]
+    region_table = load_region_table()
+    lookup = pd.DataFrame({
+        '수요기관지역명': uniques,
+        '도광역시': sido,
+        '시군구': sigungu,
+        '위도': region_keys.map(region_table['위도']),
+        '경도': region_keys.map(region_table['경도']),
+    })
 
-    return info_pur_df
+    unmatched_keys = region_keys[lookup['위도'].isna()].tolist()
+    if unmatched_keys:
+        print(f"{len(unmatched_keys)} region keys not found in region.json: {unmatched_keys[:10]}")
 
-@st.cache_data(ttl=3600)
-def load_current_year_g2b_data():
-    g2b_df = get_dataframe_from_bigquery('DATA_MARTS', 'g2b_data')
+    # 결측 지역명(코드 -1)은 마지막에 붙인 빈 행을 가리키게 한다
+    lookup = pd.concat([lookup, pd.DataFrame(index=[len(lookup)], columns=lookup.columns)])
+    codes = np.where(codes < 0, len(lookup) - 1, codes)
 
-    g2b_df['수요기관지역명'] = g2b_df['수요기관지역명'].replace({'강원도': '강원특별자치도', '전라북도': '전북특별자치도'}, regex=True)
+    geocoded = lookup.iloc[codes].set_axis(region_names.index)
+    geocoded.attrs['unmatched_region_keys'] = unmatched_keys
 
-    g2b_df['도광역시'] = g2b_df['수요기관지역명'].apply(lambda x: x.split(' ')[0])
-    g2b_df['시군구'] = g2b_df['수요기관지역명'].apply(lambda x: x.split(' ')[1] if len(x.split(' ')) > 1 else None)
+    return geocoded
 
-    columns_to_view = [
-        '납품요구번호', '납품요구변경차수', '납품요구접수일자', '물품순번', '물품분류번호',
-        '품명', '세부물품분류번호', '세부품명', '물품식별번호', '품목', '단가', '단위',
-        '수량', '금액', '납품기한일자', '계약구분', '우수제품여부', '옵션구분', '수요기관코드',
-        '수요기관명', '수요기관구분', '수요기관지역명', '업체명', '최종납품요구여부',
-        '증감납품요구수량', '증감납품요구금액', '업체사업자등록번호', '납품요구건명',
-        '계약번호', '계약변경차수', '다수공급자계약여부', '공사용자재직접구매대상여부',
-        '최초납품요구접수일자', '납품요구수량', '납품요구금액', '중소기업자간경쟁제품여부',
-        '업체기업구분명', '납품요구지청명', '도광역시', '시군구'
-    ]
+def prepare_g2b_data(g2b_df):
 
-    g2b_df = g2b_df[columns_to_view]
+    geocoded = geocode_regions(g2b_df['수요기관지역명'])
+    g2b_df = g2b_df.assign(**{column: geocoded[column] for column in geocoded.columns})
 
-    g2b_df['납품요구접수일자'] = pd.to_datetime(g2b_df['납품요구접수일자'], errors='coerce')
+    g2b_df = g2b_df[G2B_COLUMNS + ['도광역시', '시군구', '위도', '경도']]
+    g2b_df[['위도', '경도']] = g2b_df[['위도', '경도']].astype('float64')
 
-    g2b_df['단가'] = pd.to_numeric(g2b_df['단가'], errors='coerce')
-    g2b_df['수량'] = pd.to_numeric(g2b_df['수량'], errors='coerce')
-    g2b_df['금액'] = pd.to_numeric(g2b_df['금액'], errors='coerce')
+    g2b_df = coerce_dataframe(g2b_df, 'g2b_data')
 
     g2b_df = g2b_df.sort_values(by='납품요구접수일자', ascending=False)
+    g2b_df.attrs['unmatched_region_keys'] = geocoded.attrs['unmatched_region_keys']
 
-    # Load the JSON data from the file
-    with open('region.json', 'r', encoding='utf-8') as file:
-        regions = json.load(file)
+    return compact_dataframe(g2b_df)
 
-    def get_lat_long(row):
-        if pd.isna(row['시군구']):
-            region_key = f"{row['도광역시']}/"
-        else:
-            region_key = f"{row['도광역시']}/{row['시군구']}"
-
-        if region_key in regions:
-            return regions[region_key]["lat"], regions[region_key]["long"]
-        else:
-            return None, None
-
-    g2b_df[['위도', '경도']] = g2b_df.apply(get_lat_long, axis=1, result_type='expand')
+@cache_by_table_version(('DATA_MARTS', 'g2b_data'), shared=True)
+def load_current_year_g2b_data():
+    g2b_df = get_dataframe_from_bigquery('DATA_MARTS', 'g2b_data', G2B_COLUMNS)
 
-    return g2b_df
+    return prepare_g2b_data(g2b_df)
 
-@st.cache_data(ttl=3600)
+@cache_by_table_version(('DATA_WAREHOUSE', 'g2b_data'), shared=True)
 def load_g2b_data():
-    g2b_df = get_dataframe_from_bigquery('DATA_WAREHOUSE', 'g2b_data')
+    g2b_df = get_dataframe_from_bigquery('DATA_WAREHOUSE', 'g2b_data', G2B_COLUMNS)
 
-    g2b_df['수요기관지역명'] = g2b_df['수요기관지역명'].replace({'강원도': '강원특별자치도', '전라북도': '전북특별자치도'}, regex=True)
+    return prepare_g2b_data(g2b_df)
 
-    g2b_df['도광역시'] = g2b_df['수요기관지역명'].apply(lambda x: x.split(' ')[0])
-    g2b_df['시군구'] = g2b_df['수요기관지역명'].apply(lambda x: x.split(' ')[1] if len(x.split(' ')) > 1 else None)
+# 뉴스 키워드별 가중치 (NEWS_KEYWORDS='인조잔디:3,예산:2,추경:1' 형식으로 바꿀 수 있다)
+NEWS_KEYWORD_WEIGHTS = ranking_utils.parse_keyword_weights(os.environ.get('NEWS_KEYWORDS', '인조잔디:3,예산:2,추경:1'))
 
+def get_news_ranker():
+    return ranking_utils.get_keyword_ranker(tuple(NEWS_KEYWORD_WEIGHTS.items()))
+
+@cache_by_table_version(('DATA_MARTS', 'news_data'), daily=True)
+def load_news_data():
     columns_to_view = [
-        '납품요구번호', '납품요구변경차수', '납품요구접수일자', '물품순번', '물품분류번호',
-        '품명', '세부물품분류번호', '세부품명', '물품식별번호', '품목', '단가', '단위',
-        '수량', '금액', '납품기한일자', '계약구분', '우수제품여부', '옵션구분', '수요기관코드',
-        '수요기관명', '수요기관구분', '수요기관지역명', '업체명', '최종납품요구여부',
-        '증감납품요구수량', '증감납품요구금액', '업체사업자등록번호', '납품요구건명',
-        '계약번호', '계약변경차수', '다수공급자계약여부', '공사용자재직접구매대상여부',
-        '최초납품요구접수일자', '납품요구수량', '납품요구금액', '중소기업자간경쟁제품여부',
-        '업체기업구분명', '납품요구지청명', '도광역시', '시군구'
+        '기사날짜', 'URL', '제목', '내용'
     ]
 
-    g2b_df = g2b_df[columns_to_view]
-
-    g2b_df['납품요구접수일자'] = pd.to_datetime(g2b_df['납품요구접수일자'], errors='coerce')
-
-    g2b_df['단가'] = pd.to_numeric(g2b_df['단가'], errors='coerce')
-    g2b_df['수량'] = pd.to_numeric(g2b_df['수량'], errors='coerce')
-    g2b_df['금액'] = pd.to_numeric(g2b_df['금액'], errors='coerce')
-
-    g2b_df = g2b_df.sort_values(by='납품요구접수일자', ascending=False)
+    news_df = get_dataframe_from_bigquery('DATA_MARTS', 'news_data', columns_to_view).sort_values('기사날짜', ascending=False)
 
-    # Load the JSON data from the file
-    with open('region.json', 'r', encoding='utf-8') as file:
-        regions = json.load(file)
+    today = datetime.now().date()
+    latest = today - timedelta(days=3)
 
-    def get_lat_long(row):
-        if pd.isna(row['시군구']):
-            region_key = f"{row['도광역시']}/"
-        else:
-            region_key = f"{row['도광역시']}/{row['시군구']}"
+    news_df['기사날짜'] = pd.to_datetime(news_df['기사날짜'])
+    news_df = news_df[news_df['기사날짜'].dt.date >= latest]
 
-        if region_key in regions:
-            return regions[region_key]["lat"], regions[region_key]["long"]
-        else:
-            return None, None
+    # 가장 중요한 키워드가 나온 기사부터, 같은 키워드끼리는 빈도순 (동점은 최신순 유지)
+    news_df = news_df.iloc[get_news_ranker().order(news_df)]
 
-    g2b_df[['위도', '경도']] = g2b_df.apply(get_lat_long, axis=1, result_type='expand')
+    news_df = news_df[columns_to_view]
 
-    return g2b_df
+    return news_df
+
+def get_top_news(k=10):
+    # 점수는 기사 URL별로 캐시되어 있어 새 기사만 계산된다 (제목/내용 매칭 위치 포함)
+    return get_news_ranker().top_k(load_news_data(), k)
+
+# 백그라운드에서 미리 불러 둘 로더 (사용자 요청 경로에서는 빅쿼리를 기다리지 않게)
+# app.py 메뉴에서 실제로 쓰는 로더만 둔다 (g2b/입찰/뉴스처럼 화면이 없는 큰 테이블은 메모리에 올려 두지 않음)
+WARMUP_LOADERS = {
+    'users': load_users_data,
+    'list_up': load_list_up_data,
+    'budget': load_budget_data,
+    'latest_budget': load_latest_budget_data,
+    'edu_budget': load_edu_budget_data,
+}
+# 테이블 버전 확인 주기보다 짧게 돌아야 요청 경로에서 메타데이터 조회도 생기지 않는다
+WARMUP_INTERVAL = 20  # 초
+
+_warmup_status = {}
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+def start_cache_warmup():
+    global _warmup_thread
+
+    with _warmup_lock:
+        if _warmup_thread is None or not _warmup_thread.is_alive():
+            _warmup_thread = threading.Thread(target=_warmup_loop, name='cache-warmup', daemon=True)
+            _warmup_thread.start()
+
+def _warmup_loop():
+    warmed_versions = {}
+
+    while True:
+        for name, loader in WARMUP_LOADERS.items():
+            status = _warmup_status.setdefault(name, {'warm': False, 'refreshed_at': None, 'error': None})
+            try:
+                # 새 버전을 먼저 불러 캐시에 올린 뒤에 사용자 쪽 버전을 바꾼다 (refresh-ahead)
+                table_versions = loader.current_versions(fetch_table_version)
+                if warmed_versions.get(name) != table_versions:
+                    loader.warm(table_versions)
+                    warmed_versions[name] = table_versions
+                    status['refreshed_at'] = datetime.now(pytz.timezone('Asia/Seoul')).strftime('%Y-%m-%d %H:%M:%S')
+
+                for table, version in zip(loader.tables, table_versions):
+                    remember_table_version(*table, version)
+
+                status['warm'] = True
+                status['error'] = None
+            except Exception as e:
+                status['warm'] = False
+                status['error'] = str(e)
+                print(f"Failed to warm up {name}: {e}")
+
+        time.sleep(WARMUP_INTERVAL)
+
+def get_cache_warmup_status():
+    rows = [
+        {'데이터': name, '준비': _warmup_status.get(name, {}).get('warm', False),
+         '갱신 시각': _warmup_status.get(name, {}).get('refreshed_at'), '오류': _warmup_status.get(name, {}).get('error')}
+        for name in WARMUP_LOADERS
+    ]
 
-@st.cache_data(ttl=3600)
-def load_news_data():
-    news_df = get_dataframe_from_bigquery('DATA_MARTS', 'news_data').sort_values('기사날짜', ascending=False)
+    return pd.DataFrame(rows)
 
-    today = datetime.now().date()
-    latest = today - timedelta(days=3)
+def get_cache_memory_report():
 
-    news_df['기사날짜'] = pd.to_datetime(news_df['기사날짜'])
-    news_df = news_df[news_df['기사날짜'].dt.date >= latest]
+    # 공유 캐시에 올라간 프레임의 압축 전/후 크기 (캐시가 준비된 로더만, 새로 불러오지 않는다)
+    rows = []
+    for name, loader in WARMUP_LOADERS.items():
+        if not loader.shared or not is_loader_warm(loader):
+            continue
 
-    # 키워드 중요도 리스트
-    keywords = ['인조잔디','예산', '추경']
-    keyword_importance = {keyword: i for i, keyword in enumerate(keywords)}
+        result = loader()
+        for df in (result if isinstance(result, tuple) else (result,)):
+            rows.append({
+                '데이터': name,
+                '행 수': len(df),
+                '압축 전(MB)': round(df.attrs['memory_before'] / 1024 ** 2, 1) if 'memory_before' in df.attrs else None,
+                '압축 후(MB)': round(df.attrs['memory_after'] / 1024 ** 2, 1) if 'memory_after' in df.attrs else None,
+            })
 
-    def get_importance(name):
-        if name is None:
-            return float('inf')  # name이 None인 경우 맨 뒤로 정렬
-        for keyword, importance in keyword_importance.items():
-            if keyword in name:
-                return importance
-        return float('inf')  # 키워드가 없는 경우 맨 뒤로 정렬
+    return pd.DataFrame(rows, columns=['데이터', '행 수', '압축 전(MB)', '압축 후(MB)'])
 
-    # 키워드 중요도 점수 컬럼 추가
-    news_df['중요도'] = news_df['내용'].apply(get_importance)
-    news_df = news_df.sort_values(by='중요도')
-    news_df = news_df.drop(columns=['중요도'])
+def get_process_peak_memory_mb():
+    if resource is None:
+        return None
 
-    columns_to_view = [
-        '기사날짜', 'URL', '제목', '내용'
-    ]
+    # ru_maxrss 단위는 리눅스에서 KB, macOS에서 바이트
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak_rss / 1024 ** 2
 
-    news_df = news_df[columns_to_view]
+    return peak_rss / 1024
 
-    return news_df
\ No newline at end of file
+def is_loader_warm(loader):
+    # 백그라운드에서 이미 캐시에 올려 둔 로더인지
+    return any(
+        warm_loader is loader and _warmup_status.get(name, {}).get('warm', False)
+        for name, warm_loader in WARMUP_LOADERS.items()
+    )